@@ -0,0 +1,16 @@
+// function CallShared.test 0
+(CallShared.test)
+// call Math.add 2
+  @2
+  D=A
+  @R13
+  M=D
+  @Math.add
+  D=A
+  @R14
+  M=D
+  @CallShared.test$ret.1
+  D=A
+  @$CALL
+  0;JMP
+(CallShared.test$ret.1)
@@ -0,0 +1,92 @@
+// runtime
+  @$RUNTIME_END
+  0;JMP
+($EQ)
+  @R15
+  M=D
+  @SP
+  M=M-1
+  A=M
+  D=M
+  @SP
+  M=M-1
+  A=M
+  D=M-D
+  @$EQ_THEN
+  D;JEQ
+  D=0
+  @$EQ_END
+  0;JMP
+($EQ_THEN)
+  D=-1
+($EQ_END)
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @R15
+  A=M
+  0;JMP
+($LT)
+  @R15
+  M=D
+  @SP
+  M=M-1
+  A=M
+  D=M
+  @SP
+  M=M-1
+  A=M
+  D=M-D
+  @$LT_THEN
+  D;JLT
+  D=0
+  @$LT_END
+  0;JMP
+($LT_THEN)
+  D=-1
+($LT_END)
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @R15
+  A=M
+  0;JMP
+($RUNTIME_END)
+// eq
+  @CompareShared_RET1
+  D=A
+  @$EQ
+  0;JMP
+(CompareShared_RET1)
+// gt
+  @SP
+  M=M-1
+  A=M
+  D=M
+  @SP
+  M=M-1
+  A=M
+  D=M-D
+  @CompareShared_THEN2
+  D;JGT
+  D=0
+  @CompareShared_END2
+  0;JMP
+(CompareShared_THEN2)
+  D=-1
+(CompareShared_END2)
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+// lt
+  @CompareShared_RET3
+  D=A
+  @$LT
+  0;JMP
+(CompareShared_RET3)
@@ -0,0 +1,25 @@
+// function Main.test 2
+(Main.test)
+  @SP
+  A=M
+  M=0
+  @SP
+  M=M+1
+  @SP
+  A=M
+  M=0
+  @SP
+  M=M+1
+// function Main.big 40
+(Main.big)
+  @40
+  D=A
+  @SP
+  M=D+M
+(Main.big_LOCALS)
+  @SP
+  A=M-D
+  M=0
+  D=D-1
+  @Main.big_LOCALS
+  D;JGT
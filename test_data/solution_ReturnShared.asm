@@ -0,0 +1,3 @@
+// return
+  @$RETURN
+  0;JMP
@@ -0,0 +1,111 @@
+// runtime
+  @$RUNTIME_END
+  0;JMP
+($CALL)
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @LCL
+  D=M
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @ARG
+  D=M
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @THIS
+  D=M
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @THAT
+  D=M
+  @SP
+  A=M
+  M=D
+  @SP
+  M=M+1
+  @SP
+  D=M
+  @5
+  D=D-A
+  @R13
+  D=D-M
+  @ARG
+  M=D
+  @SP
+  D=M
+  @LCL
+  M=D
+  @R14
+  A=M
+  0;JMP
+($RETURN)
+  @LCL
+  D=M
+  @R13
+  M=D
+  @5
+  D=D-A
+  A=D
+  D=M
+  @R14
+  M=D
+  @SP
+  M=M-1
+  A=M
+  D=M
+  @ARG
+  A=M
+  M=D
+  @ARG
+  D=M
+  D=D+1
+  @SP
+  M=D
+  @R13
+  D=M
+  @1
+  D=D-A
+  A=D
+  D=M
+  @THAT
+  M=D
+  @R13
+  D=M
+  @2
+  D=D-A
+  A=D
+  D=M
+  @THIS
+  M=D
+  @R13
+  D=M
+  @3
+  D=D-A
+  A=D
+  D=M
+  @ARG
+  M=D
+  @R13
+  D=M
+  @4
+  D=D-A
+  A=D
+  D=M
+  @LCL
+  M=D
+  @R14
+  A=M
+  0;JMP
+($RUNTIME_END)
@@ -0,0 +1,157 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vm_translator.code_writer import CALL_ROUTINE, COMPARISON_COMMANDS, RETURN_ROUTINE, RUNTIME_END, \
+    get_comparison_routine
+
+PREDEFINED_SYMBOLS = {
+    "SP": 0,
+    "LCL": 1,
+    "ARG": 2,
+    "THIS": 3,
+    "THAT": 4,
+    **{f"R{index}": index for index in range(16)},
+    "SCREEN": 0x4000,
+    "KBD": 0x6000,
+}
+VARIABLE_BASE = 16
+MAX_ADDRESS = 0x7FFF
+
+# The a-bit and c1..c6 bits of each computation.
+COMP_CODES = {
+    "0": 0b0101010,
+    "1": 0b0111111,
+    "-1": 0b0111010,
+    "D": 0b0001100,
+    "A": 0b0110000,
+    "!D": 0b0001101,
+    "!A": 0b0110001,
+    "-D": 0b0001111,
+    "-A": 0b0110011,
+    "D+1": 0b0011111,
+    "A+1": 0b0110111,
+    "D-1": 0b0001110,
+    "A-1": 0b0110010,
+    "D+A": 0b0000010,
+    "D-A": 0b0010011,
+    "A-D": 0b0000111,
+    "D&A": 0b0000000,
+    "D|A": 0b0010101,
+    "M": 0b1110000,
+    "!M": 0b1110001,
+    "-M": 0b1110011,
+    "M+1": 0b1110111,
+    "M-1": 0b1110010,
+    "D+M": 0b1000010,
+    "D-M": 0b1010011,
+    "M-D": 0b1000111,
+    "D&M": 0b1000000,
+    "D|M": 0b1010101,
+}
+COMP_ALIASES = {
+    "A+D": "D+A",
+    "A&D": "D&A",
+    "A|D": "D|A",
+    "M+D": "D+M",
+    "M&D": "D&M",
+    "M|D": "D|M",
+}
+DEST_BITS = {
+    "A": 0b100,
+    "D": 0b010,
+    "M": 0b001,
+}
+JUMP_CODES = {
+    "": 0b000,
+    "JGT": 0b001,
+    "JEQ": 0b010,
+    "JGE": 0b011,
+    "JLT": 0b100,
+    "JNE": 0b101,
+    "JLE": 0b110,
+    "JMP": 0b111,
+}
+C_INSTRUCTION_PREFIX = 0b111 << 13
+
+RUNTIME_ROUTINES = (CALL_ROUTINE, RETURN_ROUTINE, *(get_comparison_routine(command) for command in COMPARISON_COMMANDS))
+
+# (ROM address, name) of the first instruction of each function. None names code outside functions.
+FunctionStarts = List[Tuple[int, Optional[str]]]
+
+
+def encode_c_instruction(text: str) -> int:
+    dest, _, rest = text.rpartition("=")
+    comp, _, jump = rest.partition(";")
+    comp = COMP_ALIASES.get(comp, comp)
+    if comp not in COMP_CODES or jump not in JUMP_CODES or any(letter not in DEST_BITS for letter in dest):
+        raise Exception(f"Invalid instruction: {text}")
+
+    dest_code = sum(DEST_BITS[letter] for letter in set(dest))
+    return C_INSTRUCTION_PREFIX | COMP_CODES[comp] << 6 | dest_code << 3 | JUMP_CODES[jump]
+
+
+class Assembly:
+    def __init__(self):
+        self.rom = array("H")
+        self.labels: Dict[str, int] = {}
+        self.variables: Dict[str, int] = {}
+        self.function_starts: FunctionStarts = [(0, None)]
+
+
+def assemble(lines: Iterable[str]) -> Assembly:
+    assembly = Assembly()
+    instructions = []
+    pending_function = None
+    for line in lines:
+        text = line.strip()
+        if text.startswith("// function "):
+            pending_function = text.split()[2]
+            continue
+
+        text = text.partition("//")[0].strip()
+        if not text:
+            continue
+        if text[0] == "(":
+            label = text[1:-1]
+            address = len(instructions)
+            assembly.labels[label] = address
+            # The entry label follows the function's comment; it is named after the comment in case the label
+            # was shortened.
+            if pending_function is not None:
+                assembly.function_starts.append((address, pending_function))
+            elif label in RUNTIME_ROUTINES:
+                assembly.function_starts.append((address, label))
+            elif label == RUNTIME_END:
+                assembly.function_starts.append((address, None))
+            pending_function = None
+        else:
+            instructions.append(text)
+
+    for text in instructions:
+        assembly.rom.append(encode_instruction(text, assembly))
+    return assembly
+
+
+def encode_instruction(text: str, assembly: Assembly) -> int:
+    if text[0] != "@":
+        return encode_c_instruction(text)
+
+    symbol = text[1:]
+    if symbol.isdigit():
+        value = int(symbol)
+        if value > MAX_ADDRESS:
+            raise Exception(f"Invalid instruction: {text}")
+        return value
+
+    address = PREDEFINED_SYMBOLS.get(symbol)
+    if address is None:
+        address = assembly.labels.get(symbol)
+    if address is None:
+        address = assembly.variables.setdefault(symbol, VARIABLE_BASE + len(assembly.variables))
+    return check_address(symbol, address)
+
+
+def check_address(symbol: str, address: int) -> int:
+    if address > MAX_ADDRESS:
+        raise Exception(f"Address of {symbol} is out of range: {address}")
+    return address
@@ -0,0 +1,202 @@
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, TextIO
+
+from vm_translator.code_writer import CodeWriter
+from vm_translator.main import link
+from vm_translator.parser import parse_program, scan_program
+from vm_translator.program import Program
+
+DEFAULT_SEED = 1
+DEFAULT_FILE_COUNT = 100
+DEFAULT_COMMAND_COUNT = 1_000_000
+FUNCTIONS_PER_FILE = 10
+
+SEGMENTS = ("local", "argument", "this", "that", "temp", "pointer", "static")
+SEGMENT_SIZES = {"temp": 8, "pointer": 2, "constant": 32768}
+DEFAULT_SEGMENT_SIZE = 32
+ARITHMETIC_COMMANDS = ("add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not")
+# Relative frequencies of the generated command kinds.
+COMMAND_WEIGHTS = {
+    "push": 40,
+    "pop": 20,
+    "arithmetic": 25,
+    "label": 3,
+    "goto": 2,
+    "if-goto": 4,
+    "call": 6,
+}
+
+
+class _NullOutput(io.TextIOBase):
+    def __init__(self):
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.size += len(text)
+        return len(text)
+
+
+def _get_class_name(file_index: int) -> str:
+    return f"Class{file_index}"
+
+
+def _generate_function_body(rng: random.Random, function_name: str, command_count: int,
+                            file_count: int) -> List[str]:
+    lines = []
+    label_count = 0
+    kinds = list(COMMAND_WEIGHTS)
+    weights = list(COMMAND_WEIGHTS.values())
+    for kind in rng.choices(kinds, weights, k=command_count):
+        match kind:
+            case "push" | "pop":
+                segment = "constant" if kind == "push" and rng.random() < 0.4 else rng.choice(SEGMENTS)
+                index = rng.randrange(SEGMENT_SIZES.get(segment, DEFAULT_SEGMENT_SIZE))
+                lines.append(f"{kind} {segment} {index}")
+            case "arithmetic":
+                lines.append(rng.choice(ARITHMETIC_COMMANDS))
+            case "label":
+                label_count += 1
+                lines.append(f"label L{label_count}")
+            case "goto" | "if-goto":
+                lines.append(f"{kind} L{rng.randint(1, label_count + 1)}")
+            case "call":
+                callee = f"{_get_class_name(rng.randrange(file_count))}.f{rng.randrange(FUNCTIONS_PER_FILE)}"
+                lines.append(f"call {callee} {rng.randrange(4)}")
+    lines.append(f"label L{label_count + 1}")
+    lines.append("return")
+    return [f"function {function_name} {rng.randrange(4)}", *lines]
+
+
+def generate_program(folder: Path, file_count=DEFAULT_FILE_COUNT, command_count=DEFAULT_COMMAND_COUNT,
+                     seed=DEFAULT_SEED) -> List[Path]:
+    rng = random.Random(seed)
+    commands_per_function = max(1, command_count // (file_count * FUNCTIONS_PER_FILE))
+    vm_files = []
+    for file_index in range(file_count):
+        class_name = _get_class_name(file_index)
+        lines = []
+        for function_index in range(FUNCTIONS_PER_FILE):
+            lines += _generate_function_body(rng, f"{class_name}.f{function_index}", commands_per_function,
+                                             file_count)
+        vm_file = folder / f"{class_name}.vm"
+        vm_file.write_text("\n".join(lines) + "\n")
+        vm_files.append(vm_file)
+
+    sys_file = folder / "Sys.vm"
+    sys_file.write_text("function Sys.init 0\ncall Class0.f0 0\nlabel HALT\ngoto HALT\n")
+    return [*vm_files, sys_file]
+
+
+def _measure(run: Callable[[], None], repeat: int) -> Dict[str, float]:
+    seconds = min(_time(run) for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_memory_bytes": peak_memory}
+
+
+def _time(run: Callable[[], None]) -> float:
+    start_time = time.perf_counter()
+    run()
+    return time.perf_counter() - start_time
+
+
+def _add_rates(result: Dict[str, float], command_count: int, byte_count: int) -> Dict[str, float]:
+    seconds = result["seconds"] or float("inf")
+    return {
+        **result,
+        "commands": command_count,
+        "bytes": byte_count,
+        "commands_per_second": command_count / seconds,
+        "bytes_per_second": byte_count / seconds,
+    }
+
+
+def run_benchmarks(vm_files: List[Path], repeat=1) -> Dict[str, Dict[str, float]]:
+    source_texts = [vm_file.read_text() for vm_file in vm_files]
+    source_bytes = sum(len(text.encode()) for text in source_texts)
+    programs: List[Program] = []
+
+    def parse():
+        programs[:] = [parse_program(io.StringIO(text)) for text in source_texts]
+
+    parse_result = _measure(parse, repeat)
+    command_count = sum(len(program) for program in programs)
+
+    def scan():
+        for vm_file in vm_files:
+            scan_program(vm_file)
+
+    scan_result = _measure(scan, repeat)
+
+    output = _NullOutput()
+
+    def generate_code():
+        output.size = 0
+        with CodeWriter(output) as code_writer:
+            for vm_file, program in zip(vm_files, programs):
+                code_writer.set_file_name(vm_file.stem)
+                code_writer.write_program(program)
+
+    codegen_result = _measure(generate_code, repeat)
+    output_bytes = output.size
+
+    def link_folder():
+        link(_NullOutput(), "Benchmark", vm_files, need_bootstrap=True)
+
+    link_result = _measure(link_folder, repeat)
+    return {
+        "parse": _add_rates(parse_result, command_count, source_bytes),
+        "scan": _add_rates(scan_result, command_count, source_bytes),
+        "codegen": _add_rates(codegen_result, command_count, output_bytes),
+        "link": _add_rates(link_result, command_count, source_bytes),
+    }
+
+
+def print_results(results: Dict[str, Dict[str, float]], file: TextIO):
+    for phase, result in results.items():
+        print(
+            f"{phase}: {result['seconds']:.3f} s, {result['commands_per_second']:,.0f} commands/s, "
+            f"{result['bytes_per_second'] / 1e6:.1f} MB/s, peak memory {result['peak_memory_bytes'] / 1e6:.1f} MB",
+            file=file,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the translator's throughput on a generated VM program")
+    parser.add_argument("--commands", type=int, default=DEFAULT_COMMAND_COUNT,
+                        help=f"Approximate number of generated VM commands (default: {DEFAULT_COMMAND_COUNT})")
+    parser.add_argument("--files", type=int, default=DEFAULT_FILE_COUNT,
+                        help=f"Number of generated .vm files (default: {DEFAULT_FILE_COUNT})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed of the program generator")
+    parser.add_argument("--repeat", type=int, default=1, help="Keep the fastest of N runs of each phase")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vm_files = generate_program(Path(temp_dir), args.files, args.commands, args.seed)
+        results = run_benchmarks(vm_files, args.repeat)
+
+    print_results(results, sys.stdout)
+    if args.output:
+        document = {
+            "python": platform.python_version(),
+            "generator": {"commands": args.commands, "files": args.files, "seed": args.seed},
+            "phases": results,
+        }
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from vm_translator.options import Options
+from vm_translator.program import Program
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+# Temp files older than this are left over from a store that crashed and are removed on eviction.
+STALE_TEMP_SECONDS = 60 * 60
+
+_translator_fingerprint: Optional[str] = None
+
+
+def get_default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "vm_translator"
+
+
+def get_translator_fingerprint() -> str:
+    global _translator_fingerprint
+    if _translator_fingerprint is None:
+        digest = hashlib.sha256()
+        for source_path in sorted(Path(__file__).parent.glob("*.py")):
+            if not source_path.name.startswith("test_"):
+                digest.update(source_path.read_bytes())
+        _translator_fingerprint = digest.hexdigest()
+    return _translator_fingerprint
+
+
+def get_options_key(options: Options) -> str:
+    return json.dumps(
+        {name: sorted(value) if isinstance(value, frozenset) else value for name, value in asdict(options).items()},
+        sort_keys=True,
+    )
+
+
+def get_source_bytes(source: Union[Path, Program]) -> bytes:
+    if isinstance(source, Program):
+        return b"\0".join([
+            source.opcodes.tobytes(),
+            source.arg1_ids.tobytes(),
+            source.arg2s.tobytes(),
+            "\n".join(source.symbols).encode(),
+        ])
+    return source.read_bytes()
+
+
+class TranslationCache:
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_key(self, source: Union[Path, Program], file_base_name: str, options=Options()) -> str:
+        digest = hashlib.sha256()
+        for part in (get_translator_fingerprint(), get_options_key(options), file_base_name):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update(get_source_bytes(source))
+        return digest.hexdigest()
+
+    def _get_entry_path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.json"
+
+    def contains(self, key: str) -> bool:
+        return self._get_entry_path(key).is_file()
+
+    # Entries keep the report of the file's translation with its assembly, so a hit reports the same as a miss.
+    def load(self, key: str) -> Optional[Tuple[str, Counter]]:
+        entry_path = self._get_entry_path(key)
+        try:
+            entry = json.loads(entry_path.read_text())
+        except FileNotFoundError:
+            return None
+
+        os.utime(entry_path)
+        return entry["asm"], Counter(entry["report"])
+
+    def store(self, key: str, text: str, report: Optional[Counter] = None):
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as temp_file:
+            json.dump({"asm": text, "report": dict(report or {})}, temp_file)
+        os.replace(temp_path, self._get_entry_path(key))
+
+    def evict(self):
+        self._remove_stale_temp_files()
+        entries = []
+        for entry_path in self._cache_dir.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self._max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= size
+
+    def _remove_stale_temp_files(self):
+        stale_time = time.time() - STALE_TEMP_SECONDS
+        for temp_path in self._cache_dir.glob("*.tmp"):
+            try:
+                if temp_path.stat().st_mtime < stale_time:
+                    temp_path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
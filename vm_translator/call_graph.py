@@ -0,0 +1,49 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+from vm_translator.command import CommandType
+from vm_translator.program import Program
+
+
+def get_callees(program: Program, start: int, stop: int) -> Set[str]:
+    call_opcode = CommandType.C_CALL.value
+    return {program.arg1(index) for index in range(start, stop) if program.opcodes[index] == call_opcode}
+
+
+def find_reachable_functions(programs: Iterable[Program], root_functions: Iterable[str]) -> Set[str]:
+    call_graph: Dict[str, Set[str]] = {}
+    roots = set(root_functions)
+    for program in programs:
+        for function_name, start, stop in program.get_function_ranges():
+            if function_name is None:
+                roots |= get_callees(program, start, stop)
+            else:
+                call_graph[function_name] = get_callees(program, start, stop)
+
+    reachable = set()
+    pending = [root for root in roots if root in call_graph]
+    while pending:
+        function_name = pending.pop()
+        if function_name in reachable:
+            continue
+        reachable.add(function_name)
+        pending += [callee for callee in call_graph[function_name] if callee in call_graph]
+    return reachable
+
+
+def eliminate_dead_functions(programs: List[Program],
+                             root_functions: Iterable[str]) -> Tuple[List[Program], Dict[str, int]]:
+    reachable = find_reachable_functions(programs, root_functions)
+    if not reachable:
+        return programs, {}
+
+    live_programs = []
+    dropped_functions = {}
+    for program in programs:
+        live_ranges = []
+        for function_name, start, stop in program.get_function_ranges():
+            if function_name is None or function_name in reachable:
+                live_ranges.append((start, stop))
+            else:
+                dropped_functions[function_name] = stop - start
+        live_programs.append(program.select(live_ranges))
+    return live_programs, dropped_functions
@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Only the standard library is imported so that starting the client stays cheap; the server does the work.
+SOCKET_NAME = "vm_translator.sock"
+
+
+# The socket lives in a directory only the user can use, so other users can't take over or fake the server.
+def get_default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "vm_translator", "run", SOCKET_NAME)
+
+
+DEFAULT_SOCKET_PATH = get_default_socket_path()
+
+
+def send_request(request: dict, socket_path: str = DEFAULT_SOCKET_PATH) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode())
+        with client.makefile("r") as reader:
+            line = reader.readline()
+    if not line:
+        raise Exception("The server closed the connection")
+    return json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Translate through a running vm_translator.server")
+    parser.add_argument("input_path")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, metavar="PATH")
+    parser.add_argument("--no-bootstrap", action="store_true")
+    parser.add_argument("--stdout", action="store_true")
+    parser.add_argument("--hack", action="store_true")
+    parser.add_argument("--options", type=json.loads, default={}, metavar="JSON",
+                        help='Translator options, e.g. \'{"peephole": true}\'')
+    args = parser.parse_args()
+
+    response = send_request({
+        "path": os.path.abspath(args.input_path),
+        "bootstrap": not args.no_bootstrap,
+        "stdout": args.stdout,
+        "hack": args.hack,
+        "options": args.options,
+    }, args.socket)
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        sys.exit(1)
+    if args.stdout:
+        sys.stdout.write(response["hack" if args.hack else "asm"])
+    else:
+        print(response["output_path"])
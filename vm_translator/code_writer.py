@@ -1,14 +1,69 @@
+import os
+from collections import Counter, OrderedDict
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional
+
+from vm_translator.command import CommandType
+from vm_translator.options import Options
+from vm_translator.output_sink import Output, OutputSink
+from vm_translator.peephole import PeepholeOptimizer
+from vm_translator.program import Program
+
+BOOTSTRAP_FUNCTION = "Sys.init"
+CALL_ROUTINE = "$CALL"
+RETURN_ROUTINE = "$RETURN"
+RUNTIME_END = "$RUNTIME_END"
+COMPARISON_COMMANDS = ("eq", "gt", "lt")
+
+# Instruction counts of the comparison templates, used to pick inline or shared code.
+INLINE_COMPARISON_SIZE = 19
+SHARED_COMPARISON_CALL_SIZE = 4
+SHARED_COMPARISON_ROUTINE_SIZE = 24
+
+SEGMENT_SYMBOLS = {
+    "local": "LCL",
+    "argument": "ARG",
+    "this": "THIS",
+    "that": "THAT",
+}
+JUMP_SYMBOLS = {
+    "eq": "JEQ",
+    "gt": "JGT",
+    "lt": "JLT",
+}
+
+# Instruction counts of pushing one local and of the loop that pushes them all, used by the size policy.
+PUSH_LOCAL_SIZE = 5
+LOCALS_LOOP_SIZE = 10
+
+# Rendered command templates kept per writer; the least recently used one is dropped beyond this count.
+TEMPLATE_CACHE_SIZE = 1024
+# Stands for the branch or return index in a rendered template. It cannot occur in VM names.
+INDEX_FIELD = "\0"
+
+
+def get_comparison_routine(command: str) -> str:
+    return f"${command.upper()}"
+
+
+def choose_shared_comparisons(comparison_counts: Dict[str, int]) -> FrozenSet[str]:
+    return frozenset(
+        command
+        for command, count in comparison_counts.items()
+        if count * INLINE_COMPARISON_SIZE > count * SHARED_COMPARISON_CALL_SIZE + SHARED_COMPARISON_ROUTINE_SIZE
+    )
 
 
 class CodeWriter:
-    def __init__(self, file_path: str):
-        self._file = open(file_path, "w")
-        self._file_base_name = Path(file_path).stem
-        self._current_function_name = ""
-        self._branch_index = 1
-        self._return_index = 1
+    def __init__(self, output: Output, file_base_name: Optional[str] = None,
+                 options: Options = Options()):
+        self._options = options
+        self._optimizer = PeepholeOptimizer() if options.peephole else None
+        self._templates: OrderedDict[Hashable, str] = OrderedDict()
+        if isinstance(output, (str, os.PathLike)):
+            file_base_name = file_base_name or Path(output).stem
+        self._file = output if isinstance(output, OutputSink) else OutputSink(output)
+        self.set_file_name(file_base_name)
         self._first_pop = [
             "@SP",
             "M=M-1",
@@ -28,7 +83,24 @@ class CodeWriter:
             "M=M+1",
         ]
 
+    def set_file_name(self, file_base_name: str):
+        self._flush_optimizer()
+        self._file_base_name = file_base_name
+        self._current_function_name = ""
+        self._branch_index = 1
+        self._return_index = 1
+
+    # Ends the code of the current file like closing a separate writer for it would, so a linked file reads
+    # the same whether its files were translated together or one by one.
+    def end_file(self):
+        self._flush_optimizer()
+
+    @property
+    def peephole_hits(self) -> Counter:
+        return self._optimizer.hits if self._optimizer else Counter()
+
     def close(self):
+        self._flush_optimizer()
         self._file.close()
 
     def __enter__(self):
@@ -38,9 +110,38 @@ class CodeWriter:
         self.close()
 
     def _write_statements(self, statements: List[str]):
-        statements = [self._post_process(statement) for statement in statements]
-        for statement in statements:
-            self._file.write(statement)
+        if self._optimizer:
+            statements = self._optimizer.process(statements)
+        self._file.write(self._render(statements))
+
+    def _render(self, statements: List[str]) -> str:
+        return "".join([self._post_process(statement) for statement in statements])
+
+    def _get_template(self, key: Hashable, get_statements: Callable[[], List[str]]) -> str:
+        template = self._templates.get(key)
+        if template is None:
+            template = self._render(get_statements())
+            if len(self._templates) >= TEMPLATE_CACHE_SIZE:
+                self._templates.popitem(last=False)
+            self._templates[key] = template
+        else:
+            self._templates.move_to_end(key)
+        return template
+
+    def _write_rendered(self, text: str):
+        if self._optimizer:
+            self._write_statements([line.lstrip() for line in text.splitlines()])
+        else:
+            self._file.write(text)
+
+    def _flush_optimizer(self):
+        if self._optimizer:
+            for statement in self._optimizer.flush():
+                self._file.write(self._post_process(statement))
+
+    def write_text(self, text: str):
+        self._flush_optimizer()
+        self._file.write(text)
 
     def _post_process(self, statement: str) -> str:
         if statement[0] in ("(", "/"):
@@ -48,28 +149,61 @@ class CodeWriter:
         else:
             return f"  {statement}\n"
 
+    def write_command(self, command_type: CommandType, arg1: Optional[str], arg2: Optional[int]):
+        match command_type:
+            case CommandType.C_ARITHMETIC:
+                self.write_arithmetic(arg1)
+            case CommandType.C_PUSH:
+                self.write_push_pop("push", arg1, arg2)
+            case CommandType.C_POP:
+                self.write_push_pop("pop", arg1, arg2)
+            case CommandType.C_LABEL:
+                self.write_label(arg1)
+            case CommandType.C_GOTO:
+                self.write_goto(arg1)
+            case CommandType.C_IF:
+                self.write_if(arg1)
+            case CommandType.C_FUNCTION:
+                self.write_function(arg1, arg2)
+            case CommandType.C_CALL:
+                self.write_call(arg1, arg2)
+            case CommandType.C_RETURN:
+                self.write_return()
+
+    def write_program(self, program: Program):
+        for fields in program.iter_fields():
+            self.write_command(*fields)
+
+    def write_comment(self, comment: str):
+        self._write_statements([f"// {comment}"])
+
     def write_arithmetic(self, command: str):
+        if command in COMPARISON_COMMANDS:
+            key = ("arithmetic", command, self._get_label_prefix())
+            template = self._get_template(key, lambda: self._get_arithmetic_asm(command, INDEX_FIELD))
+            self._write_rendered(template.replace(INDEX_FIELD, str(self._branch_index)))
+            self._branch_index += 1
+        else:
+            self._write_rendered(self._get_template(("arithmetic", command), lambda: self._get_arithmetic_asm(command)))
+
+    def _get_arithmetic_asm(self, command: str, index: Optional[str] = None) -> List[str]:
         match command:
             case "add":
-                assem = self._get_binary_input_asm("add", ["D=D+M"])
+                return self._get_binary_input_asm("add", ["D=D+M"])
             case "sub":
-                assem = self._get_binary_input_asm("sub", ["D=M-D"])
+                return self._get_binary_input_asm("sub", ["D=M-D"])
             case "and":
-                assem = self._get_binary_input_asm("and", ["D=D&M"])
+                return self._get_binary_input_asm("and", ["D=D&M"])
             case "or":
-                assem = self._get_binary_input_asm("or", ["D=D|M"])
+                return self._get_binary_input_asm("or", ["D=D|M"])
             case "neg":
-                assem = self._get_unary_input_asm("neg", ["D=-D"])
+                return self._get_unary_input_asm("neg", ["D=-D"])
             case "not":
-                assem = self._get_unary_input_asm("not", ["D=!D"])
-            case "eq":
-                assem = self._get_binary_input_asm("eq", self._get_comparison_asm("eq"))
-            case "gt":
-                assem = self._get_binary_input_asm("gt", self._get_comparison_asm("gt"))
-            case "lt":
-                assem = self._get_binary_input_asm("lt", self._get_comparison_asm("lt"))
-
-        self._write_statements(assem)
+                return self._get_unary_input_asm("not", ["D=!D"])
+            case ("eq" | "gt" | "lt") if command in self._options.shared_comparisons:
+                return self._get_shared_comparison_call_asm(command, index)
+            case "eq" | "gt" | "lt":
+                return self._get_binary_input_asm(command, self._get_comparison_asm(command, index))
 
     def _get_binary_input_asm(self, command_name: str, command_statements: List[str]) -> List[str]:
         return [
@@ -88,39 +222,60 @@ class CodeWriter:
             *self._final_push,
         ]
 
-    def _get_comparison_asm(self, command: str) -> List[str]:
-        jump_symbol_table = {
-            "eq": "JEQ",
-            "gt": "JGT",
-            "lt": "JLT",
-        }
-        statements = [
+    def _get_comparison_asm(self, command: str, index: str) -> List[str]:
+        label_prefix = f"{self._get_label_prefix()}_"
+        return self._get_branch_asm(command, f"{label_prefix}THEN{index}", f"{label_prefix}END{index}")
+
+    def _get_branch_asm(self, command: str, then_label: str, end_label: str) -> List[str]:
+        return [
             "D=M-D",
-            f"@{self._get_label_prefix()}_THEN{self._branch_index}",
-            f"D;{jump_symbol_table[command]}",
+            f"@{then_label}",
+            f"D;{JUMP_SYMBOLS[command]}",
             "D=0",
-            f"@{self._get_label_prefix()}_END{self._branch_index}",
+            f"@{end_label}",
             "0;JMP",
-            f"({self._get_label_prefix()}_THEN{self._branch_index})",
+            f"({then_label})",
             "D=-1",
-            f"({self._get_label_prefix()}_END{self._branch_index})",
+            f"({end_label})",
+        ]
+
+    def _get_shared_comparison_call_asm(self, command: str, index: str) -> List[str]:
+        return_label = f"{self._get_label_prefix()}_RET{index}"
+        return [
+            f"// {command}",
+            f"@{return_label}",
+            "D=A",
+            f"@{get_comparison_routine(command)}",
+            "0;JMP",
+            f"({return_label})",
+        ]
+
+    def _get_comparison_routine_asm(self, command: str) -> List[str]:
+        routine = get_comparison_routine(command)
+        return [
+            f"({routine})",
+            "@R15",
+            "M=D",
+            *self._first_pop,
+            *self._second_pop,
+            *self._get_branch_asm(command, f"{routine}_THEN", f"{routine}_END"),
+            *self._final_push,
+            "@R15",
+            "A=M",
+            "0;JMP",
         ]
-        self._branch_index += 1
-        return statements
 
     def write_push_pop(self, command: str, segment: str, index: int):
-        segment_symbol_table = {
-            "local": "LCL",
-            "argument": "ARG",
-            "this": "THIS",
-            "that": "THAT",
-        }
+        key = ("push_pop", command, segment, index, self._file_base_name if segment == "static" else None)
+        self._write_rendered(self._get_template(key, lambda: self._get_push_pop_asm(command, segment, index)))
+
+    def _get_push_pop_asm(self, command: str, segment: str, index: int) -> List[str]:
         assem = [f"// {command} {segment} {index}"]
 
         match (command, segment, index):
             case ("push", ("local" | "argument" | "this" | "that") as segment, index):
                 assem += [
-                    f"@{segment_symbol_table[segment]}",
+                    f"@{SEGMENT_SYMBOLS[segment]}",
                     "D=M",
                     f"@{index}",
                     "A=D+A",
@@ -129,7 +284,7 @@ class CodeWriter:
                 ]
             case ("pop", ("local" | "argument" | "this" | "that") as segment, index):
                 assem += [
-                    f"@{segment_symbol_table[segment]}",
+                    f"@{SEGMENT_SYMBOLS[segment]}",
                     "D=M",
                     f"@{index}",
                     "D=D+A",
@@ -207,19 +362,21 @@ class CodeWriter:
                     f"@{self._file_base_name}.{index}",
                     "M=D",
                 ]
-
-        self._write_statements(assem)
+        return assem
 
     def write_function(self, function_name: str, nvars: int):
         statements = [
             f"// function {function_name} {nvars}",
             f"({function_name})",
-            *self._get_push_nvars_asm(nvars),
+            *self._get_push_nvars_asm(function_name, nvars),
         ]
         self._write_statements(statements)
         self._current_function_name = function_name
 
-    def _get_push_nvars_asm(self, nvars: int) -> List[str]:
+    def _get_push_nvars_asm(self, function_name: str, nvars: int) -> List[str]:
+        if self._options.optimize_for == "size" and nvars * PUSH_LOCAL_SIZE > LOCALS_LOOP_SIZE:
+            return self._get_push_nvars_loop_asm(function_name, nvars)
+
         push_statements = [
             "@SP",
             "A=M",
@@ -229,6 +386,22 @@ class CodeWriter:
         ]
         return [item for _ in range(nvars) for item in push_statements]
 
+    def _get_push_nvars_loop_asm(self, function_name: str, nvars: int) -> List[str]:
+        loop_label = f"{function_name}_LOCALS"
+        return [
+            f"@{nvars}",
+            "D=A",
+            "@SP",
+            "M=D+M",
+            f"({loop_label})",
+            "@SP",
+            "A=M-D",
+            "M=0",
+            "D=D-1",
+            f"@{loop_label}",
+            "D;JGT",
+        ]
+
     def write_label(self, label: str):
         statements = [
             f"// label {label}",
@@ -258,34 +431,66 @@ class CodeWriter:
         self._write_statements(statements)
 
     def write_call(self, function_name: str, nvars: int):
-        return_label = f"{self._get_label_prefix()}$ret.{self._return_index}"
-        statements = [
+        key = ("call", function_name, nvars, self._get_label_prefix())
+        template = self._get_template(key, lambda: self._get_call_asm(function_name, nvars, INDEX_FIELD))
+        self._write_rendered(template.replace(INDEX_FIELD, str(self._return_index)))
+        self._return_index += 1
+
+    def _get_call_asm(self, function_name: str, nvars: int, index: str) -> List[str]:
+        return_label = f"{self._get_label_prefix()}$ret.{index}"
+        if self._options.shared_routines:
+            call_statements = [
+                f"@{nvars}",
+                "D=A",
+                "@R13",
+                "M=D",
+                f"@{function_name}",
+                "D=A",
+                "@R14",
+                "M=D",
+                f"@{return_label}",
+                "D=A",
+                f"@{CALL_ROUTINE}",
+                "0;JMP",
+            ]
+        else:
+            call_statements = [
+                f"@{return_label}",
+                "D=A",
+                *self._get_push_frame_asm(),
+                *self._get_reposition_asm([f"@{nvars}", "D=D-A"]),
+                f"@{function_name}",
+                "0;JMP",
+            ]
+        return [
             f"// call {function_name} {nvars}",
-            f"@{return_label}",
-            "D=A",
+            *call_statements,
+            f"({return_label})"
+        ]
+
+    def _get_push_frame_asm(self) -> List[str]:
+        return [
             *self._final_push,
             *self._get_push_segment_asm("LCL"),
             *self._get_push_segment_asm("ARG"),
             *self._get_push_segment_asm("THIS"),
             *self._get_push_segment_asm("THAT"),
+        ]
+
+    def _get_reposition_asm(self, subtract_nvars_statements: List[str]) -> List[str]:
+        return [
             "@SP",
             "D=M",
             "@5",
             "D=D-A",
-            f"@{nvars}",
-            "D=D-A",
+            *subtract_nvars_statements,
             "@ARG",
             "M=D",
             "@SP",
             "D=M",
             "@LCL",
             "M=D",
-            f"@{function_name}",
-            "0;JMP",
-            f"({return_label})"
         ]
-        self._write_statements(statements)
-        self._return_index += 1
 
     def _get_push_segment_asm(self, segment: str) -> List[str]:
         return [
@@ -295,8 +500,22 @@ class CodeWriter:
         ]
 
     def write_return(self):
-        statements = [
+        self._write_rendered(self._get_template(("return",), self._get_return_command_asm))
+
+    def _get_return_command_asm(self) -> List[str]:
+        if self._options.shared_routines:
+            return [
+                "// return",
+                f"@{RETURN_ROUTINE}",
+                "0;JMP",
+            ]
+        return [
             "// return",
+            *self._get_return_asm(),
+        ]
+
+    def _get_return_asm(self) -> List[str]:
+        return [
             "@LCL",
             "D=M",
             "@R13",
@@ -324,7 +543,6 @@ class CodeWriter:
             "A=M",
             "0;JMP",
         ]
-        self._write_statements(statements)
 
     def _get_recover_segment_asm(self, segment: str, index: int) -> List[str]:
         return [
@@ -347,4 +565,32 @@ class CodeWriter:
             "M=D",
         ]
         self._write_statements(statements)
-        self.write_call("Sys.init", 0)
+        self.write_call(BOOTSTRAP_FUNCTION, 0)
+
+    def write_runtime(self):
+        routines = []
+        if self._options.shared_routines:
+            routines += [
+                f"({CALL_ROUTINE})",
+                *self._get_push_frame_asm(),
+                *self._get_reposition_asm(["@R13", "D=D-M"]),
+                "@R14",
+                "A=M",
+                "0;JMP",
+                f"({RETURN_ROUTINE})",
+                *self._get_return_asm(),
+            ]
+        for command in COMPARISON_COMMANDS:
+            if command in self._options.shared_comparisons:
+                routines += self._get_comparison_routine_asm(command)
+        if not routines:
+            return
+
+        statements = [
+            "// runtime",
+            f"@{RUNTIME_END}",
+            "0;JMP",
+            *routines,
+            f"({RUNTIME_END})",
+        ]
+        self._write_statements(statements)
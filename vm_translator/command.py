@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional, Tuple
 
 
 class CommandType(Enum):
@@ -13,45 +14,35 @@ class CommandType(Enum):
     C_CALL = 9
 
 
+CommandFields = Tuple[CommandType, Optional[str], Optional[int]]
+
+
+def parse_command(text: str) -> CommandFields:
+    match text.split():
+        case ["push", arg1, arg2]:
+            return CommandType.C_PUSH, arg1, int(arg2)
+        case ["pop", arg1, arg2]:
+            return CommandType.C_POP, arg1, int(arg2)
+        case ["label", label]:
+            return CommandType.C_LABEL, label, None
+        case ["goto", label]:
+            return CommandType.C_GOTO, label, None
+        case ["if-goto", label]:
+            return CommandType.C_IF, label, None
+        case ["function", function_name, nvars]:
+            return CommandType.C_FUNCTION, function_name, int(nvars)
+        case ["call", function_name, nvars]:
+            return CommandType.C_CALL, function_name, int(nvars)
+        case ["return"]:
+            return CommandType.C_RETURN, None, None
+        case [command, *_]:
+            return CommandType.C_ARITHMETIC, command, None
+
+
 class Command:
-    def __init__(self, text: str):
-        match text.split():
-            case ["push", arg1, arg2]:
-                self._command_type = CommandType.C_PUSH
-                self._arg1 = arg1
-                self._arg2 = int(arg2)
-            case ["pop", arg1, arg2]:
-                self._command_type = CommandType.C_POP
-                self._arg1 = arg1
-                self._arg2 = int(arg2)
-            case ["label", label]:
-                self._command_type = CommandType.C_LABEL
-                self._arg1 = label
-                self._arg2 = None
-            case ["goto", label]:
-                self._command_type = CommandType.C_GOTO
-                self._arg1 = label
-                self._arg2 = None
-            case ["if-goto", label]:
-                self._command_type = CommandType.C_IF
-                self._arg1 = label
-                self._arg2 = None
-            case ["function", function_name, nvars]:
-                self._command_type = CommandType.C_FUNCTION
-                self._arg1 = function_name
-                self._arg2 = int(nvars)
-            case ["call", function_name, nvars]:
-                self._command_type = CommandType.C_CALL
-                self._arg1 = function_name
-                self._arg2 = int(nvars)
-            case ["return"]:
-                self._command_type = CommandType.C_RETURN
-                self._arg1 = None
-                self._arg2 = None
-            case [command, *_]:
-                self._command_type = CommandType.C_ARITHMETIC
-                self._arg1 = command
-                self._arg2 = None
+    def __init__(self, text: str, line_number: int = 0):
+        self._command_type, self._arg1, self._arg2 = parse_command(text)
+        self.line_number = line_number
 
     @property
     def command_type(self) -> CommandType:
@@ -66,3 +57,7 @@ class Command:
         if self._arg2 is None:
             raise Exception("Not supported type")
         return self._arg2
+
+    @property
+    def fields(self) -> CommandFields:
+        return self._command_type, self._arg1, self._arg2
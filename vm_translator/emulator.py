@@ -0,0 +1,256 @@
+import argparse
+import bisect
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, TextIO, Tuple
+
+from vm_translator.assembler import COMP_CODES, FunctionStarts, assemble
+from vm_translator.source_map import SourceMap
+
+RAM_SIZE = 0x8000
+WORD_MASK = 0xFFFF
+TOP_LEVEL_NAME = "<top level>"
+# 0;JMP, which ends a program when it jumps to itself.
+HALT_JUMP_INSTRUCTION = 0b1110101010000111
+
+# Python expressions of each computation on unsigned 16-bit a, d and ram.
+COMP_EXPRESSIONS = {
+    "0": "0",
+    "1": "1",
+    "-1": "65535",
+    "D": "d",
+    "A": "a",
+    "!D": "d ^ 65535",
+    "!A": "a ^ 65535",
+    "-D": "-d & 65535",
+    "-A": "-a & 65535",
+    "D+1": "(d + 1) & 65535",
+    "A+1": "(a + 1) & 65535",
+    "D-1": "(d - 1) & 65535",
+    "A-1": "(a - 1) & 65535",
+    "D+A": "(d + a) & 65535",
+    "D-A": "(d - a) & 65535",
+    "A-D": "(a - d) & 65535",
+    "D&A": "d & a",
+    "D|A": "d | a",
+    "M": "ram[a]",
+    "!M": "ram[a] ^ 65535",
+    "-M": "-ram[a] & 65535",
+    "M+1": "(ram[a] + 1) & 65535",
+    "M-1": "(ram[a] - 1) & 65535",
+    "D+M": "(d + ram[a]) & 65535",
+    "D-M": "(d - ram[a]) & 65535",
+    "M-D": "(ram[a] - d) & 65535",
+    "D&M": "d & ram[a]",
+    "D|M": "d | ram[a]",
+}
+COMP_EXPRESSION_TABLE = {code: COMP_EXPRESSIONS[comp] for comp, code in COMP_CODES.items()}
+# Conditions on the unsigned computed value v, indexed by the jump bits.
+JUMP_CONDITIONS = [
+    None,
+    "0 < v < 32768",
+    "v == 0",
+    "v < 32768",
+    "v >= 32768",
+    "v != 0",
+    "v == 0 or v >= 32768",
+]
+
+# Runs the instructions of a block and returns the next pc and the new a and d.
+BlockFunction = Callable[[array, int, int], Tuple[int, int, int]]
+# (function, number of instructions, index of the owning function, block id)
+Block = Tuple[BlockFunction, int, int, int]
+
+
+def _get_instruction_source(instruction: int) -> List[str]:
+    if instruction < 0x8000:
+        return [f"a = {instruction}"]
+
+    comp = COMP_EXPRESSION_TABLE.get((instruction >> 6) & 0b1111111)
+    if comp is None:
+        raise Exception(f"Invalid instruction: {instruction:016b}")
+
+    dest = (instruction >> 3) & 0b111
+    jump = instruction & 0b111
+    lines = []
+    if jump:
+        lines.append("t = a")
+    lines.append(f"v = {comp}")
+    if dest & 0b001:
+        lines.append("ram[a] = v")
+    if dest & 0b100:
+        lines.append("a = v")
+    if dest & 0b010:
+        lines.append("d = v")
+    return lines
+
+
+# A Hack CPU that compiles each straight-line run of ROM up to a jump into one Python function.
+class Emulator:
+    def __init__(self, rom: Sequence[int], function_starts: FunctionStarts = ()):
+        self.rom = array("H", rom)
+        self.ram = array("H", bytes(2 * RAM_SIZE))
+        self.pc = 0
+        self.a = 0
+        self.d = 0
+        self.cycles = 0
+        self.halted = False
+        self._blocks: Dict[int, Block] = {}
+        self._block_ranges: List[Tuple[int, int]] = []
+        self._block_counts: List[int] = []
+        self._halt_loops: Set[int] = set()
+
+        starts = {}
+        for address, name in function_starts:
+            starts[address] = name
+        self._start_addresses = sorted(starts)
+        self.function_names = [starts[address] or TOP_LEVEL_NAME for address in self._start_addresses]
+        self.function_cycles = [0] * len(self.function_names)
+        if not self._start_addresses or self._start_addresses[0] != 0:
+            self._start_addresses.insert(0, 0)
+            self.function_names.insert(0, TOP_LEVEL_NAME)
+            self.function_cycles.insert(0, 0)
+
+    @classmethod
+    def from_asm(cls, lines) -> "Emulator":
+        assembly = assemble(lines)
+        return cls(assembly.rom, assembly.function_starts)
+
+    def run(self, max_cycles: int) -> int:
+        ram = self.ram
+        pc, a, d = self.pc, self.a, self.d
+        cycles = 0
+        blocks = self._blocks
+        function_cycles = self.function_cycles
+        block_counts = self._block_counts
+        rom_size = len(self.rom)
+        while cycles < max_cycles:
+            if pc >= rom_size or pc in self._halt_loops:
+                self.halted = True
+                break
+
+            block = blocks.get(pc)
+            if block is None:
+                block = self._compile_block(pc, 0)
+                if pc in self._halt_loops:
+                    continue
+            if cycles + block[1] > max_cycles:
+                block = self._compile_block(pc, max_cycles - cycles)
+            function, size, owner, block_id = block
+            pc, a, d = function(ram, a, d)
+            cycles += size
+            function_cycles[owner] += size
+            block_counts[block_id] += 1
+
+        self.pc, self.a, self.d = pc, a, d
+        self.cycles += cycles
+        return cycles
+
+    def get_function_cycles(self) -> Counter:
+        report = Counter()
+        for name, cycles in zip(self.function_names, self.function_cycles):
+            if cycles:
+                report[name] += cycles
+        return report
+
+    def get_instruction_counts(self) -> List[int]:
+        counts = [0] * len(self.rom)
+        for (start, stop), count in zip(self._block_ranges, self._block_counts):
+            for address in range(start, stop):
+                counts[address] += count
+        return counts
+
+    def _compile_block(self, start: int, max_size: int) -> Block:
+        owner = bisect.bisect_right(self._start_addresses, start) - 1
+        stop = len(self.rom)
+        if owner + 1 < len(self._start_addresses):
+            stop = self._start_addresses[owner + 1]
+        if max_size:
+            stop = min(stop, start + max_size)
+
+        if self._is_halt_loop(start):
+            self._halt_loops.add(start)
+
+        lines = []
+        pc = start
+        jump = 0
+        while pc < stop and not jump and (pc == start or not self._is_halt_loop(pc)):
+            instruction = self.rom[pc]
+            lines += _get_instruction_source(instruction)
+            pc += 1
+            jump = instruction & 0b111 if instruction >= 0x8000 else 0
+
+        if jump == 0b111:
+            lines.append("return t, a, d")
+        else:
+            if jump:
+                lines.append(f"if {JUMP_CONDITIONS[jump]}: return t, a, d")
+            lines.append(f"return {pc}, a, d")
+
+        source = "def block(ram, a, d):\n" + "".join(f"    {line}\n" for line in lines)
+        namespace = {}
+        exec(compile(source, f"<rom {start}>", "exec"), namespace)
+        block = (namespace["block"], pc - start, owner, len(self._block_ranges))
+        self._block_ranges.append((start, pc))
+        self._block_counts.append(0)
+        if not max_size:
+            self._blocks[start] = block
+        return block
+
+    def _is_halt_loop(self, address: int) -> bool:
+        return self.rom[address] == address and address + 1 < len(self.rom) and \
+            self.rom[address + 1] == HALT_JUMP_INSTRUCTION
+
+
+def load_emulator(asm_path: Path) -> Emulator:
+    with asm_path.open() as asm_file:
+        return Emulator.from_asm(asm_file)
+
+
+def print_run_report(emulator: Emulator, file: Optional[TextIO] = None):
+    state = "halted" if emulator.halted else "running"
+    print(f"Cycles: {emulator.cycles} ({state} at pc {emulator.pc})", file=file)
+    for name, cycles in emulator.get_function_cycles().most_common():
+        print(f"  {name}: {cycles}", file=file)
+
+
+def print_source_lines(emulator: Emulator, source_map: SourceMap, count: int, file: Optional[TextIO] = None):
+    line_cycles = Counter()
+    for address, cycles in enumerate(emulator.get_instruction_counts()):
+        if cycles and (source := source_map.lookup(address)):
+            line_cycles[source] += cycles
+
+    print("Hottest VM lines:", file=file)
+    for (file_name, line_number, function_name), cycles in line_cycles.most_common(count):
+        print(f"  {file_name}:{line_number} ({function_name or TOP_LEVEL_NAME}): {cycles}", file=file)
+
+
+def parse_ram_assignment(text: str) -> Tuple[int, int]:
+    address, _, value = text.partition("=")
+    return int(address), int(value) & WORD_MASK
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Hack assembly on an emulated Hack CPU and count cycles")
+    parser.add_argument("asm_path", help="Hack assembly file (.asm)")
+    parser.add_argument("--ticks", type=int, default=1_000_000,
+                        help="Maximum number of instructions to run (default: 1000000)")
+    parser.add_argument("--set", dest="ram_assignments", action="append", metavar="ADDRESS=VALUE",
+                        type=parse_ram_assignment, help="Set a RAM word before running, e.g. 0=256")
+    parser.add_argument("--dump", dest="dump_addresses", action="append", metavar="ADDRESS", type=int,
+                        help="Print a RAM word after running")
+    parser.add_argument("--source-map", type=Path, metavar="MAP",
+                        help="Source map written with the translator's --source-map, to report the hottest VM lines")
+    parser.add_argument("--top", type=int, default=10, metavar="N", help="Number of VM lines to report (default: 10)")
+    args = parser.parse_args()
+
+    emulator = load_emulator(Path(args.asm_path))
+    for address, value in args.ram_assignments or ():
+        emulator.ram[address] = value
+    emulator.run(args.ticks)
+    print_run_report(emulator)
+    if args.source_map:
+        print_source_lines(emulator, SourceMap.load(args.source_map), args.top)
+    for address in args.dump_addresses or ():
+        print(f"RAM[{address}] = {emulator.ram[address]}")
@@ -0,0 +1,116 @@
+from typing import Iterable, Iterator, List, Optional
+
+from vm_translator.command import Command, CommandType
+
+MAX_CONSTANT = 0x7FFF
+
+BINARY_COMMANDS = ("add", "sub", "and", "or", "eq", "gt", "lt")
+UNARY_COMMANDS = ("neg", "not")
+
+# Binary commands that leave the other operand unchanged when the constant is the second operand.
+IDENTITY_CONSTANTS = {
+    "add": 0,
+    "sub": 0,
+    "or": 0,
+    "and": -1,
+}
+
+
+def to_word(value: int) -> int:
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+def evaluate(command: str, *operands: int) -> int:
+    match (command, *operands):
+        case ("add", x, y):
+            return to_word(x + y)
+        case ("sub", x, y):
+            return to_word(x - y)
+        case ("and", x, y):
+            return x & y
+        case ("or", x, y):
+            return x | y
+        # Comparisons test the wrapped difference, like the generated D=M-D; D;J.. sequence.
+        case ("eq", x, y):
+            return -1 if to_word(x - y) == 0 else 0
+        case ("gt", x, y):
+            return -1 if to_word(x - y) > 0 else 0
+        case ("lt", x, y):
+            return -1 if to_word(x - y) < 0 else 0
+        case ("neg", x):
+            return to_word(-x)
+        case ("not", x):
+            return ~x
+
+
+def get_constant_commands(value: int, line_number: int = 0) -> List[Command]:
+    if 0 <= value <= MAX_CONSTANT:
+        return [Command(f"push constant {value}", line_number)]
+    return [Command(f"push constant {~value}", line_number), Command("not", line_number)]
+
+
+class ConstantFolder:
+    def __init__(self):
+        self.input_count = 0
+        self.output_count = 0
+        self._constants: List[int] = []
+        # Source line of each pending constant: the line of the last command folded into it.
+        self._constant_lines: List[int] = []
+        self._unary: Optional[Command] = None
+
+    @property
+    def eliminated(self) -> int:
+        return self.input_count - self.output_count
+
+    def fold(self, commands: Iterable[Command]) -> Iterator[Command]:
+        for command in commands:
+            self.input_count += 1
+            yield from self._fold_command(command)
+        yield from self._flush()
+
+    def _fold_command(self, command: Command) -> Iterator[Command]:
+        match command.command_type, command.arg1:
+            case CommandType.C_PUSH, "constant":
+                if self._unary:
+                    yield from self._flush()
+                self._constants.append(command.arg2)
+                self._constant_lines.append(command.line_number)
+            case CommandType.C_ARITHMETIC, name if name in BINARY_COMMANDS and len(self._constants) >= 2:
+                y = self._constants.pop()
+                x = self._constants.pop()
+                self._constants.append(evaluate(name, x, y))
+                del self._constant_lines[-2:]
+                self._constant_lines.append(command.line_number)
+            case CommandType.C_ARITHMETIC, name if len(self._constants) == 1 and \
+                    self._constants[0] == IDENTITY_CONSTANTS.get(name):
+                self._constants.pop()
+                self._constant_lines.pop()
+            case CommandType.C_ARITHMETIC, name if name in UNARY_COMMANDS and self._constants:
+                self._constants[-1] = evaluate(name, self._constants[-1])
+                self._constant_lines[-1] = command.line_number
+            case CommandType.C_ARITHMETIC, name if name in UNARY_COMMANDS and self._unary:
+                if self._unary.arg1 == name:
+                    self._unary = None
+                else:
+                    yield from self._flush()
+                    self._unary = command
+            case CommandType.C_ARITHMETIC, name if name in UNARY_COMMANDS:
+                yield from self._flush()
+                self._unary = command
+            case _:
+                yield from self._flush()
+                yield from self._emit([command])
+
+    def _flush(self) -> Iterator[Command]:
+        for value, line_number in zip(self._constants, self._constant_lines):
+            yield from self._emit(get_constant_commands(value, line_number))
+        self._constants = []
+        self._constant_lines = []
+
+        if self._unary:
+            yield from self._emit([self._unary])
+            self._unary = None
+
+    def _emit(self, commands: List[Command]) -> Iterator[Command]:
+        self.output_count += len(commands)
+        yield from commands
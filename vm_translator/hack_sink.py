@@ -0,0 +1,108 @@
+from array import array
+from typing import Dict, List, Optional, Tuple, Union
+
+from vm_translator.assembler import MAX_ADDRESS, PREDEFINED_SYMBOLS, VARIABLE_BASE, check_address, \
+    encode_c_instruction
+from vm_translator.output_sink import DEFAULT_BUFFER_SIZE, Output, OutputSink
+
+# Encoded chunks and lines kept for reuse; each cache is cleared when it grows past its size.
+CHUNK_CACHE_SIZE = 4096
+LINE_CACHE_SIZE = 65536
+
+# Runs of encoded words, each followed by the label defined after it (or None).
+EncodedChunk = List[Tuple[array, Optional[str]]]
+
+
+# Encodes the generated assembly into Hack machine code as it is written and writes the .hack text on close.
+# Symbols are stored as negative ids and backpatched once all labels are known; the remaining ones are
+# variables, allocated from RAM 16 in the order they first appear like the Hack assembler does.
+class HackSink(OutputSink):
+    def __init__(self, output: Output, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(output, buffer_size)
+        self.rom = array("i")
+        self.labels: Dict[str, int] = {}
+        self._symbol_ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._encoded_chunks: Dict[str, EncodedChunk] = {}
+        self._encoded_lines: Dict[str, Union[int, str, None]] = {}
+
+    def write(self, text: str):
+        encoded_chunk = self._encoded_chunks.get(text)
+        if encoded_chunk is None:
+            encoded_chunk = self._encode_chunk(text)
+            if len(self._encoded_chunks) >= CHUNK_CACHE_SIZE:
+                self._encoded_chunks.clear()
+            self._encoded_chunks[text] = encoded_chunk
+
+        for words, label in encoded_chunk:
+            self.rom.extend(words)
+            if label is not None:
+                self.labels[label] = len(self.rom)
+
+    def _encode_chunk(self, text: str) -> EncodedChunk:
+        encoded_chunk = []
+        words = array("i")
+        for line in text.splitlines():
+            item = self._encoded_lines.get(line)
+            if item is None and line not in self._encoded_lines:
+                item = self._encode_line(line)
+                if len(self._encoded_lines) >= LINE_CACHE_SIZE:
+                    self._encoded_lines.clear()
+                self._encoded_lines[line] = item
+            if isinstance(item, int):
+                words.append(item)
+            elif item is not None:
+                encoded_chunk.append((words, item))
+                words = array("i")
+        encoded_chunk.append((words, None))
+        return encoded_chunk
+
+    def _encode_line(self, line: str) -> Union[int, str, None]:
+        text = line.partition("//")[0].strip()
+        if not text:
+            return None
+        if text[0] == "(":
+            return text[1:-1]
+        if text[0] != "@":
+            return encode_c_instruction(text)
+
+        symbol = text[1:]
+        if symbol.isdigit():
+            value = int(symbol)
+            if value > MAX_ADDRESS:
+                raise Exception(f"Invalid instruction: {text}")
+            return value
+        if symbol in PREDEFINED_SYMBOLS:
+            return PREDEFINED_SYMBOLS[symbol]
+        return self._get_symbol_id(symbol)
+
+    def _get_symbol_id(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            self._symbols.append(symbol)
+            symbol_id = -len(self._symbols)
+            self._symbol_ids[symbol] = symbol_id
+        return symbol_id
+
+    def resolve(self) -> array:
+        addresses = [0] * len(self._symbols)
+        variable_count = 0
+        for index, symbol in enumerate(self._symbols):
+            address = self.labels.get(symbol)
+            if address is None:
+                address = VARIABLE_BASE + variable_count
+                variable_count += 1
+            addresses[index] = check_address(symbol, address)
+
+        rom = array("H", [word if word >= 0 else addresses[-word - 1] for word in self.rom])
+        self.rom = array("i")
+        return rom
+
+    def close(self):
+        if self.closed:
+            return
+
+        rom = self.resolve()
+        word_texts = {word: f"{word:016b}\n" for word in set(rom)}
+        OutputSink.write(self, "".join(map(word_texts.__getitem__, rom)))
+        super().close()
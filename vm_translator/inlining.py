@@ -0,0 +1,179 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from vm_translator.command import CommandFields, CommandType
+from vm_translator.folding import BINARY_COMMANDS, UNARY_COMMANDS
+from vm_translator.program import Program
+
+DEFAULT_INLINE_THRESHOLD = 12
+TEMP_SIZE = 8
+# VM labels can't contain "$", so the labels of inlined bodies never clash with the caller's own labels.
+INLINE_LABEL_PREFIX = "$inline"
+
+
+# A function without calls, locals or temp accesses whose body can replace a call to it. Its arguments are
+# popped into the last temp registers at the call site and the pointers it changes are saved on the stack.
+# Temp is shared by all functions, so a call is only inlined when no function of the program uses those temps.
+class LeafFunction:
+    def __init__(self, file_name: str, body: List[CommandFields]):
+        self.file_name = file_name
+        self.body = body
+        self.argument_count = 0
+        self.saved_pointers: Tuple[int, ...] = ()
+        self.uses_static = False
+
+    def get_temp_base(self, nargs: int) -> int:
+        return TEMP_SIZE - nargs - (1 if self.saved_pointers else 0)
+
+    def can_inline(self, nargs: int, file_name: str, used_temps: Set[int]) -> bool:
+        temp_base = self.get_temp_base(nargs)
+        return self.argument_count <= nargs and temp_base >= 0 and \
+            (not self.uses_static or file_name == self.file_name) and \
+            not any(temp_base <= temp < TEMP_SIZE for temp in used_temps)
+
+
+def get_leaf_function(program: Program, start: int, stop: int, file_name: str,
+                      threshold: int) -> Optional[LeafFunction]:
+    if stop - start - 1 > threshold or program.arg2(start) != 0:
+        return None
+
+    leaf = LeafFunction(file_name, [program.fields(index) for index in range(start + 1, stop)])
+    saved_pointers = set()
+    for command_type, arg1, arg2 in leaf.body:
+        match command_type, arg1:
+            case CommandType.C_CALL, _:
+                return None
+            case CommandType.C_PUSH | CommandType.C_POP, "local" | "temp":
+                return None
+            case CommandType.C_POP, "constant":
+                return None
+            case CommandType.C_PUSH | CommandType.C_POP, "argument":
+                leaf.argument_count = max(leaf.argument_count, arg2 + 1)
+            case CommandType.C_PUSH | CommandType.C_POP, "static":
+                leaf.uses_static = True
+            case CommandType.C_POP, "pointer":
+                saved_pointers.add(arg2)
+            case CommandType.C_ARITHMETIC, name if name not in BINARY_COMMANDS and name not in UNARY_COMMANDS:
+                return None
+    leaf.saved_pointers = tuple(sorted(saved_pointers))
+    return leaf if _has_balanced_stack(leaf.body) else None
+
+
+# The body must never pop below the stack it started with and must leave exactly the return value on every
+# path to a return, because the inlined code has no frame to reset the stack pointer to.
+def _has_balanced_stack(body: List[CommandFields]) -> bool:
+    labels = {arg1: index for index, (command_type, arg1, _) in enumerate(body) if command_type == CommandType.C_LABEL}
+    depths: Dict[int, int] = {}
+    pending = [(0, 0)]
+    while pending:
+        index, depth = pending.pop()
+        while index not in depths:
+            if index >= len(body):
+                return False
+
+            depths[index] = depth
+            command_type, arg1, _ = body[index]
+            match command_type:
+                case CommandType.C_RETURN:
+                    if depth != 1:
+                        return False
+                    break
+                case CommandType.C_PUSH:
+                    depth += 1
+                case CommandType.C_POP:
+                    depth -= 1
+                case CommandType.C_ARITHMETIC:
+                    operand_count = 2 if arg1 in BINARY_COMMANDS else 1
+                    if depth < operand_count:
+                        return False
+                    depth -= operand_count - 1
+                case CommandType.C_GOTO | CommandType.C_IF:
+                    if arg1 not in labels:
+                        return False
+                    if command_type == CommandType.C_GOTO:
+                        index = labels[arg1]
+                        continue
+                    depth -= 1
+                    pending.append((labels[arg1], depth))
+            if depth < 0:
+                return False
+            index += 1
+        else:
+            if depths[index] != depth:
+                return False
+    return True
+
+
+def find_leaf_functions(programs: List[Program], file_names: List[str], threshold: int) -> Dict[str, LeafFunction]:
+    leaves = {}
+    for program, file_name in zip(programs, file_names):
+        for function_name, start, stop in program.get_function_ranges():
+            if function_name is not None and (leaf := get_leaf_function(program, start, stop, file_name, threshold)):
+                leaves[function_name] = leaf
+    return leaves
+
+
+def inline_leaf_functions(programs: List[Program], file_names: List[str],
+                          threshold: int) -> Tuple[List[Program], Counter]:
+    leaves = find_leaf_functions(programs, file_names, threshold)
+    if not leaves:
+        return programs, Counter()
+
+    used_temps = set().union(*(_get_used_temps(program) for program in programs))
+    inlined_calls = Counter()
+    inlined_programs = []
+    site_count = 0
+    for program, file_name in zip(programs, file_names):
+        first_site = site_count
+        inlined_program = Program()
+        for function_name, start, stop in program.get_function_ranges():
+            for index in range(start, stop):
+                command_type, arg1, arg2 = fields = program.fields(index)
+                line_number = program.line_numbers[index]
+                leaf = leaves.get(arg1) if command_type == CommandType.C_CALL else None
+                if leaf and leaf.can_inline(arg2, file_name, used_temps):
+                    label = f"{INLINE_LABEL_PREFIX}{site_count}"
+                    _append_inlined_call(inlined_program, leaf, arg2, label, line_number)
+                    inlined_calls[f"{arg1} in {function_name or file_name}"] += 1
+                    site_count += 1
+                else:
+                    inlined_program.append(*fields, line_number)
+        inlined_programs.append(inlined_program if site_count > first_site else program)
+    return inlined_programs, inlined_calls
+
+
+def _get_used_temps(program: Program) -> Set[int]:
+    temp_opcodes = (CommandType.C_PUSH.value, CommandType.C_POP.value)
+    return {program.arg2(index) for index in range(len(program))
+            if program.opcodes[index] in temp_opcodes and program.arg1(index) == "temp"}
+
+
+def _append_inlined_call(program: Program, leaf: LeafFunction, nargs: int, label: str, line_number: int):
+    temp_base = leaf.get_temp_base(nargs)
+    for argument in reversed(range(nargs)):
+        program.append(CommandType.C_POP, "temp", temp_base + argument, line_number)
+    for pointer in leaf.saved_pointers:
+        program.append(CommandType.C_PUSH, "pointer", pointer, line_number)
+
+    needs_end_label = False
+    for position, (command_type, arg1, arg2) in enumerate(leaf.body):
+        match command_type, arg1:
+            case CommandType.C_PUSH | CommandType.C_POP, "argument":
+                program.append(command_type, "temp", temp_base + arg2, line_number)
+            case CommandType.C_LABEL | CommandType.C_GOTO | CommandType.C_IF, _:
+                program.append(command_type, f"{label}${arg1}", None, line_number)
+            case CommandType.C_RETURN, _:
+                if position < len(leaf.body) - 1:
+                    program.append(CommandType.C_GOTO, label, None, line_number)
+                    needs_end_label = True
+            case _:
+                program.append(command_type, arg1, arg2, line_number)
+    if needs_end_label:
+        program.append(CommandType.C_LABEL, label, None, line_number)
+
+    if leaf.saved_pointers:
+        result_temp = temp_base + nargs
+        program.append(CommandType.C_POP, "temp", result_temp, line_number)
+        for pointer in reversed(leaf.saved_pointers):
+            program.append(CommandType.C_POP, "pointer", pointer, line_number)
+        program.append(CommandType.C_PUSH, "temp", result_temp, line_number)
@@ -0,0 +1,64 @@
+import json
+import re
+from pathlib import Path
+from typing import Dict, Match, Optional
+
+from vm_translator.assembler import PREDEFINED_SYMBOLS
+from vm_translator.output_sink import DEFAULT_BUFFER_SIZE, Output, OutputSink
+
+# Label definitions and A-instructions with a symbol. Symbols starting with "$" are the runtime routines,
+# which are already short.
+SYMBOL_PATTERN = re.compile(r"^(\(|  @)([A-Za-z_.:][\w.$:]*)(\)?)$", re.MULTILINE)
+SHORT_LABEL_PREFIX = "_"
+SHORT_LABEL_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def is_label(symbol: str) -> bool:
+    if symbol in PREDEFINED_SYMBOLS:
+        return False
+    # Static variables are named File.index; generated labels with a dot and a number also contain "$".
+    file_name, dot, index = symbol.rpartition(".")
+    return not (dot and index.isdigit() and "$" not in file_name)
+
+
+# Short labels start with "_" and contain no "." or "$", so they can't clash with the symbols that are kept.
+def get_short_label(number: int) -> str:
+    digits = []
+    while True:
+        number, digit = divmod(number, len(SHORT_LABEL_DIGITS))
+        digits.append(SHORT_LABEL_DIGITS[digit])
+        if not number:
+            return SHORT_LABEL_PREFIX + "".join(reversed(digits))
+
+
+# Replaces every generated label with a short token as the code is written and, on close, saves the readable
+# names of the tokens to map_path.
+class ShortLabelSink(OutputSink):
+    def __init__(self, output: Output, map_path: Optional[Path] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(output, buffer_size)
+        self.short_labels: Dict[str, str] = {}
+        self._map_path = map_path
+
+    def write(self, text: str):
+        super().write(SYMBOL_PATTERN.sub(self._replace_symbol, text))
+
+    def _replace_symbol(self, match: Match) -> str:
+        symbol = match[2]
+        if not is_label(symbol):
+            return match[0]
+
+        short_label = self.short_labels.get(symbol)
+        if short_label is None:
+            short_label = self.short_labels[symbol] = get_short_label(len(self.short_labels))
+        return f"{match[1]}{short_label}{match[3]}"
+
+    def get_label_map(self) -> Dict[str, str]:
+        return {short_label: label for label, short_label in self.short_labels.items()}
+
+    def close(self):
+        if self.closed:
+            return
+
+        super().close()
+        if self._map_path:
+            self._map_path.write_text(json.dumps(self.get_label_map(), indent=0) + "\n")
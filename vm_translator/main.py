@@ -1,83 +1,419 @@
 import sys
+import io
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from collections import Counter
+from itertools import repeat
 from pathlib import Path
+from typing import FrozenSet, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
-from vm_translator.parser import Parser
-from vm_translator.code_writer import CodeWriter
-from vm_translator.command import CommandType
+from vm_translator.parser import iter_commands, scan_program
+from vm_translator.cache import DEFAULT_MAX_BYTES, TranslationCache, get_default_cache_dir
+from vm_translator.call_graph import eliminate_dead_functions
+from vm_translator.code_writer import CodeWriter, BOOTSTRAP_FUNCTION, COMPARISON_COMMANDS, choose_shared_comparisons
+from vm_translator.command import Command, CommandType
+from vm_translator.folding import ConstantFolder
+from vm_translator.hack_sink import HackSink
+from vm_translator.inlining import DEFAULT_INLINE_THRESHOLD, inline_leaf_functions
+from vm_translator.label_sink import ShortLabelSink
+from vm_translator.options import Options
+from vm_translator.output_sink import Output
+from vm_translator.program import Program
+from vm_translator.tos_code_writer import TosCodeWriter
 
 
-def translate(input_path_str: str, need_bootstrap=False):
+def translate(input_path_str: str, need_bootstrap=False, jobs=1, to_stdout=False, options=Options(),
+              report: Optional[Counter] = None, cache: Optional[TranslationCache] = None, to_hack=False,
+              short_labels=False):
     input_path = Path(input_path_str)
     if input_path.is_file():
-        translate_file(input_path_str)
+        translate_file(input_path_str, to_stdout, options, report, to_hack, short_labels)
     elif input_path.is_dir():
-        translate_folder(input_path, need_bootstrap)
+        translate_folder(input_path, need_bootstrap, jobs, to_stdout, options, report, cache, to_hack, short_labels)
 
 
-def translate_file(input_path: str) -> Path:
+def translate_file(input_path: str, to_stdout=False, options=Options(),
+                   report: Optional[Counter] = None, to_hack=False, short_labels=False) -> Optional[Path]:
     folder_path, file_name = os.path.split(input_path)
     file_base_name, _ = os.path.splitext(file_name)
-    output_path = os.path.join(folder_path, f"{file_base_name}.asm")
-
-    with open(input_path, "r") as input_file:
-        input_text = input_file.read()
-
-    parser = Parser(input_text)
-    with CodeWriter(output_path) as code_writer:
-        while parser.has_more_lines():
-            parser.advance()
-
-            match parser.command_type():
-                case CommandType.C_ARITHMETIC:
-                    code_writer.write_arithmetic(parser.arg1())
-                case CommandType.C_PUSH:
-                    code_writer.write_push_pop("push", parser.arg1(), parser.arg2())
-                case CommandType.C_POP:
-                    code_writer.write_push_pop("pop", parser.arg1(), parser.arg2())
-                case CommandType.C_LABEL:
-                    code_writer.write_label(parser.arg1())
-                case CommandType.C_GOTO:
-                    code_writer.write_goto(parser.arg1())
-                case CommandType.C_IF:
-                    code_writer.write_if(parser.arg1())
-                case CommandType.C_FUNCTION:
-                    code_writer.write_function(parser.arg1(), parser.arg2())
-                case CommandType.C_CALL:
-                    code_writer.write_call(parser.arg1(), parser.arg2())
-                case CommandType.C_RETURN:
-                    code_writer.write_return()
-
-    return Path(output_path)
-
-
-def translate_folder(input_folder: Path, need_bootstrap=False):
+    output_path = os.path.join(folder_path, f"{file_base_name}{get_output_suffix(to_hack)}")
+
+    output = get_output(sys.stdout if to_stdout else output_path, to_hack,
+                        get_label_map_path(Path(output_path)) if short_labels else None)
+    with create_code_writer(output, file_base_name, options) as code_writer:
+        code_writer.write_runtime()
+        write_file(code_writer, Path(input_path), options, report)
+
+    add_to_report(report, code_writer)
+    return None if to_stdout else Path(output_path)
+
+
+def translate_to_asm_text(input_path: Path, need_bootstrap=False, options=Options(),
+                          report: Optional[Counter] = None, to_hack=False) -> str:
+    output = io.StringIO()
+    if input_path.is_dir():
+        link(get_output(output, to_hack), input_path.name, get_vm_files(input_path), need_bootstrap,
+             options=options, report=report)
+    else:
+        with create_code_writer(get_output(output, to_hack), input_path.stem, options) as code_writer:
+            code_writer.write_runtime()
+            write_file(code_writer, input_path, options, report)
+        add_to_report(report, code_writer)
+    return output.getvalue()
+
+
+def translate_vm_text(text: str, file_base_name: str, options=Options(), report: Optional[Counter] = None) -> str:
+    output = io.StringIO()
+    with create_code_writer(output, file_base_name, options) as code_writer:
+        code_writer.write_runtime()
+        commands = iter_commands(text.splitlines())
+        if options.fold_constants:
+            folder = ConstantFolder()
+            commands = folder.fold(commands)
+        write_commands(code_writer, commands)
+
+    add_to_report(report, code_writer)
+    if options.fold_constants and report is not None:
+        report[f"folded commands {file_base_name}.vm"] += folder.eliminated
+    return output.getvalue()
+
+
+def get_output_suffix(to_hack: bool) -> str:
+    return ".hack" if to_hack else ".asm"
+
+
+def get_output_path(input_path: Path, to_hack=False) -> Path:
+    output_stem = input_path / input_path.name if input_path.is_dir() else input_path
+    return output_stem.with_suffix(get_output_suffix(to_hack))
+
+
+def get_label_map_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.name}.labels")
+
+
+# Machine code has no labels left, so label_map_path only shortens the labels of assembly output.
+def get_output(output: Output, to_hack: bool, label_map_path: Optional[Path] = None) -> Output:
+    if to_hack:
+        return HackSink(output)
+    return ShortLabelSink(output, label_map_path) if label_map_path else output
+
+
+def create_code_writer(output: Output, file_base_name: str, options=Options()) -> CodeWriter:
+    if options.cache_top_of_stack:
+        return TosCodeWriter(output, file_base_name, options)
+    return CodeWriter(output, file_base_name, options)
+
+
+def translate_to_text(source: Union[Path, Program], file_base_name: str, options=Options()) -> Tuple[str, Counter]:
+    output = io.StringIO()
+    file_report = Counter()
+    with create_code_writer(output, file_base_name, options) as code_writer:
+        write_source(code_writer, source, options, file_report)
+
+    add_to_report(file_report, code_writer)
+    return output.getvalue(), file_report
+
+
+def write_source(code_writer: CodeWriter, source: Union[Path, Program], options=Options(),
+                 report: Optional[Counter] = None):
+    if isinstance(source, Program):
+        code_writer.write_program(source)
+    else:
+        write_file(code_writer, source, options, report)
+
+
+def write_file(code_writer: CodeWriter, vm_file: Path, options=Options(), report: Optional[Counter] = None):
+    write_commands(code_writer, read_commands(vm_file, options, report))
+
+
+# Loads the whole file for the passes that need to see all of the program; translation alone streams it.
+def read_program(vm_file: Path, options=Options(), report: Optional[Counter] = None) -> Program:
+    if not options.fold_constants:
+        return scan_program(vm_file)
+
+    program = Program()
+    program.append_commands(read_commands(vm_file, options, report))
+    return program
+
+
+def read_commands(vm_file: Path, options=Options(), report: Optional[Counter] = None) -> Iterator[Command]:
+    with vm_file.open(mode="r") as input_file:
+        commands = iter_commands(input_file)
+        if not options.fold_constants:
+            yield from commands
+            return
+
+        folder = ConstantFolder()
+        yield from folder.fold(commands)
+
+    if report is not None:
+        report[f"folded commands {vm_file.name}"] += folder.eliminated
+
+
+def is_whole_program(options: Options) -> bool:
+    return options.eliminate_dead_functions or options.inline_threshold > 0
+
+
+def read_whole_program(vm_files: List[Path], need_bootstrap=False, options=Options(),
+                       report: Optional[Counter] = None) -> List[Program]:
+    programs = [read_program(vm_file, options, report) for vm_file in vm_files]
+    return optimize_whole_program(programs, vm_files, need_bootstrap, options, report)
+
+
+def optimize_whole_program(programs: List[Program], vm_files: List[Path], need_bootstrap=False, options=Options(),
+                           report: Optional[Counter] = None) -> List[Program]:
+    if options.inline_threshold:
+        programs, inlined_calls = inline_leaf_functions(programs, [vm_file.stem for vm_file in vm_files],
+                                                        options.inline_threshold)
+        if report is not None:
+            report.update({f"inlined call {name}": count for name, count in inlined_calls.items()})
+
+    if options.eliminate_dead_functions:
+        root_functions = [*options.root_functions, *([BOOTSTRAP_FUNCTION] if need_bootstrap else [])]
+        programs, dropped_functions = eliminate_dead_functions(programs, root_functions)
+        if report is not None:
+            report.update({f"dropped function {name}": size for name, size in dropped_functions.items()})
+    return programs
+
+
+def add_to_report(report: Optional[Counter], code_writer: CodeWriter):
+    if report is not None:
+        report.update({f"peephole {name}": hits for name, hits in code_writer.peephole_hits.items()})
+
+
+def write_commands(code_writer: CodeWriter, commands: Iterable[Command]):
+    for command in commands:
+        code_writer.write_command(*command.fields)
+
+
+def translate_folder(input_folder: Path, need_bootstrap=False, jobs=1, to_stdout=False,
+                     options=Options(), report: Optional[Counter] = None,
+                     cache: Optional[TranslationCache] = None, to_hack=False, short_labels=False) -> Optional[Path]:
     vm_files = sorted(input_folder.glob("*.vm"))
-    asm_files = [translate_file(str(vm_file)) for vm_file in vm_files]
-    out_file_path = input_folder / f"{input_folder.name}.asm"
+    out_file_path = input_folder / f"{input_folder.name}{get_output_suffix(to_hack)}"
+    label_map_path = get_label_map_path(out_file_path) if short_labels else None
+    if to_stdout:
+        link(get_output(sys.stdout, to_hack, label_map_path), input_folder.name, vm_files, need_bootstrap, jobs,
+             options, report, cache)
+        return None
+
+    with out_file_path.open(mode="w") as out_file:
+        link(get_output(out_file, to_hack, label_map_path), input_folder.name, vm_files, need_bootstrap, jobs,
+             options, report, cache)
+
+    return out_file_path
+
+
+def link(out_file: Output, program_name: str, vm_files: List[Path], need_bootstrap=False, jobs=1,
+         options=Options(), report: Optional[Counter] = None, cache: Optional[TranslationCache] = None):
+    with create_code_writer(out_file, program_name, options) as code_writer:
+        write_header(code_writer, need_bootstrap)
+
+        sources: List[Union[Path, Program]] = vm_files
+        if is_whole_program(options):
+            sources = read_whole_program(vm_files, need_bootstrap, options, report)
+
+        if jobs > 1 or cache:
+            file_base_names = [vm_file.stem for vm_file in vm_files]
+            results = translate_sources(sources, file_base_names, jobs, options, cache)
+            write_translations(code_writer, vm_files, results, report)
+        else:
+            for vm_file, source in zip(vm_files, sources):
+                code_writer.write_comment(f"> {vm_file.stem}.asm")
+                code_writer.set_file_name(vm_file.stem)
+                write_source(code_writer, source, options, report)
+                code_writer.end_file()
+
+    add_to_report(report, code_writer)
+    if cache:
+        cache.evict()
+
+
+def write_header(code_writer: CodeWriter, need_bootstrap=False):
+    if need_bootstrap:
+        code_writer.write_bootstrap()
+    code_writer.write_runtime()
+
+
+def write_translations(code_writer: CodeWriter, vm_files: List[Path], results: Iterable[Tuple[str, Counter]],
+                       report: Optional[Counter] = None):
+    for vm_file, (asm_text, file_report) in zip(vm_files, results):
+        code_writer.write_comment(f"> {vm_file.stem}.asm")
+        code_writer.write_text(asm_text)
+        if report is not None:
+            report.update(file_report)
+
 
-    with CodeWriter(str(out_file_path)) as code_writer:
-        if need_bootstrap:
-            code_writer.write_bootstrap()
+def translate_sources(sources: List[Union[Path, Program]], file_base_names: List[str], jobs=1, options=Options(),
+                      cache: Optional[TranslationCache] = None) -> Iterator[Tuple[str, Counter]]:
+    keys = [cache.get_key(source, name, options) if cache else None for source, name in zip(sources, file_base_names)]
+    hits = {index for index, key in enumerate(keys) if key and cache.contains(key)}
+    misses = [index for index in range(len(sources)) if index not in hits]
 
-    with out_file_path.open(mode="a") as out_file:
-        for asm_file_path in asm_files:
-            with asm_file_path.open(mode="r") as asm_file:
-                asm_text = asm_file.read()
-                out_file.write(f"// > {asm_file_path.name}\n{asm_text}")
+    use_pool = jobs > 1 and len(misses) > 1
+    with ProcessPoolExecutor(max_workers=min(jobs, len(misses))) if use_pool else nullcontext() as executor:
+        miss_results = (executor.map if use_pool else map)(
+            translate_to_text,
+            [sources[index] for index in misses],
+            [file_base_names[index] for index in misses],
+            repeat(options),
+        )
+        for index, key in enumerate(keys):
+            if index in hits and (entry := cache.load(key)) is not None:
+                asm_text, file_report = entry
+                file_report["cache hits"] += 1
+                yield asm_text, file_report
+                continue
 
-            asm_file_path.unlink()
+            if index in hits:
+                asm_text, file_report = translate_to_text(sources[index], file_base_names[index], options)
+            else:
+                asm_text, file_report = next(miss_results)
+            if key:
+                cache.store(key, asm_text, file_report)
+                file_report["cache misses"] += 1
+            yield asm_text, file_report
+
+
+class InstructionCounter(io.TextIOBase):
+    def __init__(self):
+        self.count = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.count += text.startswith("  ") + text.count("\n  ")
+        return len(text)
+
+
+def get_vm_files(input_path: Path) -> List[Path]:
+    return sorted(input_path.glob("*.vm")) if input_path.is_dir() else [input_path]
+
+
+def count_instructions(input_path_str: str, need_bootstrap=False, options=Options()) -> int:
+    input_path = Path(input_path_str)
+    counter = InstructionCounter()
+    link(counter, input_path.stem, get_vm_files(input_path), need_bootstrap and input_path.is_dir(),
+         options=options)
+    return counter.count
+
+
+def count_comparisons(vm_files: List[Path]) -> Counter:
+    comparison_counts = Counter()
+    for vm_file in vm_files:
+        with vm_file.open(mode="r") as input_file:
+            comparison_counts.update(
+                command.arg1
+                for command in iter_commands(input_file)
+                if command.command_type == CommandType.C_ARITHMETIC and command.arg1 in COMPARISON_COMMANDS
+            )
+    return comparison_counts
+
+
+def resolve_shared_comparisons(input_path_str: str, mode: str) -> FrozenSet[str]:
+    match mode:
+        case "inline":
+            return frozenset()
+        case "shared":
+            return frozenset(COMPARISON_COMMANDS)
+        case "auto":
+            return choose_shared_comparisons(count_comparisons(get_vm_files(Path(input_path_str))))
+
+
+def print_size_report(input_path_str: str, need_bootstrap: bool, options: Options, file: TextIO):
+    inline_count = count_instructions(input_path_str, need_bootstrap)
+    count = count_instructions(input_path_str, need_bootstrap, options)
+    change = (count - inline_count) / inline_count * 100 if inline_count else 0.0
+    print(f"Instructions: {inline_count} -> {count} ({change:+.1f}%)", file=file)
+
+
+def print_report(report: Counter, file: TextIO):
+    for name, count in sorted(report.items()):
+        print(f"{name}: {count}", file=file)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("input_path")
     parser.add_argument("--no-bootstrap", action="store_true")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N")
+    parser.add_argument("--stdout", action="store_true")
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--hack", action="store_true")
+    parser.add_argument("--short-labels", action="store_true")
+    parser.add_argument("--shared-routines", action="store_true")
+    parser.add_argument("--comparisons", choices=("inline", "shared", "auto"), default="inline")
+    parser.add_argument("--optimize", action="store_true")
+    parser.add_argument("--optimize-for", choices=("speed", "size"), default="speed")
+    parser.add_argument("--fold-constants", action="store_true")
+    parser.add_argument("--cache-tos", action="store_true")
+    parser.add_argument("--eliminate-dead-functions", action="store_true")
+    parser.add_argument("--root", action="append", dest="root_functions", metavar="FUNCTION")
+    parser.add_argument("--inline", nargs="?", type=int, const=DEFAULT_INLINE_THRESHOLD, default=0, metavar="SIZE")
+    parser.add_argument("--size-report", action="store_true")
+    parser.add_argument("--stats", nargs="?", const="text", choices=("text", "json"))
+    parser.add_argument("--stats-memory", action="store_true")
+    parser.add_argument("--source-map", action="store_true")
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--cache-dir", type=Path, default=get_default_cache_dir())
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar="MB")
     args = parser.parse_args()
+    if args.stats_memory and not args.stats:
+        parser.error("--stats-memory requires --stats")
+    if args.watch:
+        watch_conflicts = {"--hack": args.hack, "--stdout": args.stdout, "--pipeline": args.pipeline,
+                           "--source-map": args.source_map, "--jobs": args.jobs != 1, "--stats": args.stats,
+                           "--size-report": args.size_report}
+        if used_conflicts := [name for name, used in watch_conflicts.items() if used]:
+            parser.error(f"--watch can't be combined with {', '.join(used_conflicts)}")
 
-    print(f"Start translating for '{args.input_path}'")
+    log_file = sys.stderr if args.stdout else sys.stdout
+    print(f"Start translating for '{args.input_path}'", file=log_file)
 
     need_bootstrap = not args.no_bootstrap
-    translate(args.input_path, need_bootstrap=need_bootstrap)
-    print("Completed")
+    options = Options(
+        shared_routines=args.shared_routines,
+        shared_comparisons=resolve_shared_comparisons(args.input_path, args.comparisons),
+        peephole=args.optimize,
+        fold_constants=args.fold_constants,
+        cache_top_of_stack=args.cache_tos,
+        eliminate_dead_functions=args.eliminate_dead_functions,
+        root_functions=tuple(args.root_functions or ()),
+        inline_threshold=args.inline,
+        optimize_for=args.optimize_for,
+    )
+    if args.watch:
+        from vm_translator.watch import watch
+        watch(args.input_path, need_bootstrap, options, short_labels=args.short_labels)
+        sys.exit()
+
+    report = Counter()
+    if args.stats:
+        from vm_translator.stats import print_stats, print_stats_json, translate_with_stats
+        stats = translate_with_stats(args.input_path, need_bootstrap, args.stdout, options, report, args.hack,
+                                     args.short_labels, args.stats_memory)
+    elif args.pipeline and Path(args.input_path).is_file():
+        from vm_translator.pipeline import translate_file_pipelined
+        translate_file_pipelined(args.input_path, args.stdout, options, report, args.hack, args.short_labels)
+    else:
+        use_cache = not args.no_cache and Path(args.input_path).is_dir()
+        cache = TranslationCache(args.cache_dir, args.cache_size * 1024 * 1024) if use_cache else None
+        translate(args.input_path, need_bootstrap=need_bootstrap, jobs=args.jobs, to_stdout=args.stdout,
+                  options=options, report=report, cache=cache, to_hack=args.hack, short_labels=args.short_labels)
+    if args.source_map:
+        from vm_translator.source_map import write_source_map
+        output_path = get_output_path(Path(args.input_path), args.hack)
+        write_source_map(args.input_path, output_path.with_name(f"{output_path.name}.map"), need_bootstrap, options,
+                         None if args.hack or args.stdout else output_path)
+    print_report(report, log_file)
+    if args.stats == "text":
+        print_stats(stats, log_file)
+    elif args.stats == "json":
+        print_stats_json(stats, log_file)
+    if args.size_report:
+        print_size_report(args.input_path, need_bootstrap, options, log_file)
+    print("Completed", file=log_file)
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Tuple
+
+
+@dataclass(frozen=True)
+class Options:
+    shared_routines: bool = False
+    shared_comparisons: FrozenSet[str] = frozenset()
+    peephole: bool = False
+    fold_constants: bool = False
+    cache_top_of_stack: bool = False
+    eliminate_dead_functions: bool = False
+    root_functions: Tuple[str, ...] = ()
+    inline_threshold: int = 0
+    optimize_for: str = "speed"
@@ -0,0 +1,57 @@
+import io
+import os
+from typing import BinaryIO, List, TextIO, Union
+
+Output = Union[str, os.PathLike, TextIO, BinaryIO, bytearray, "OutputSink"]
+
+# Number of characters collected before they are handed to the underlying output in one write.
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+def is_binary_stream(stream) -> bool:
+    return isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(stream, "mode", "")
+
+
+# Collects the generated text and writes it to a path, a text or binary stream or a bytearray in large chunks.
+class OutputSink:
+    def __init__(self, output: Output, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._buffer_size = buffer_size
+        self._chunks: List[str] = []
+        self._size = 0
+        self._owns_stream = isinstance(output, (str, os.PathLike))
+        self._stream = open(output, "w") if self._owns_stream else output
+        self.closed = False
+
+    def write(self, text: str):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_size:
+            self._write_chunks()
+
+    def _write_chunks(self):
+        if not self._chunks:
+            return
+
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        if isinstance(self._stream, bytearray):
+            self._stream += text.encode()
+        elif is_binary_stream(self._stream):
+            self._stream.write(text.encode())
+        else:
+            self._stream.write(text)
+
+    def flush(self):
+        self._write_chunks()
+        if not isinstance(self._stream, bytearray):
+            self._stream.flush()
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.flush()
+        if self._owns_stream:
+            self._stream.close()
+        self.closed = True
@@ -1,36 +1,101 @@
-from typing import List
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
 
-from vm_translator.command import CommandType, Command
+from vm_translator.command import CommandType, Command, parse_command
+from vm_translator.program import NO_ARG2, Program
+
+# Parsed lines kept while scanning a file; the cache is cleared when it grows past this size.
+LINE_CACHE_SIZE = 65536
+
+
+def get_valid_text(text: str) -> str:
+    COMMENT_ID = "//"
+    if COMMENT_ID in text:
+        valid_text = text.split(COMMENT_ID)[0]
+    else:
+        valid_text = text
+
+    return valid_text.strip()
+
+
+def iter_commands(lines: Iterable[str]) -> Iterator[Command]:
+    for line_number, line in enumerate(lines, 1):
+        if valid_text := get_valid_text(line):
+            yield Command(valid_text, line_number)
+
+
+def parse_program(lines: Iterable[str]) -> Program:
+    program = Program()
+    for line_number, line in enumerate(lines, 1):
+        if valid_text := get_valid_text(line):
+            program.append(*parse_command(valid_text), line_number)
+    return program
+
+
+def scan_program(vm_file: Path) -> Program:
+    with vm_file.open(mode="rb") as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:
+            return Program()
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return scan_lines(iter(buffer.readline, b""))
+
+
+# Scans the lines of a .vm file as bytes. VM code repeats the same lines a lot, so each distinct line is only
+# stripped, decoded and parsed once and its opcode, symbol id and argument are appended straight to the program
+# arrays.
+def scan_lines(lines: Iterable[bytes]) -> Program:
+    program = Program()
+    opcodes, arg1_ids, arg2s, line_numbers = program.opcodes, program.arg1_ids, program.arg2s, program.line_numbers
+    parsed_lines: Dict[bytes, Tuple[int, ...]] = {}
+    for line_number, line in enumerate(lines, 1):
+        fields = parsed_lines.get(line)
+        if fields is None:
+            if len(parsed_lines) >= LINE_CACHE_SIZE:
+                parsed_lines.clear()
+            fields = parsed_lines[line] = _parse_line(program, line)
+        if fields:
+            opcode, symbol_id, arg2 = fields
+            opcodes.append(opcode)
+            arg1_ids.append(symbol_id)
+            arg2s.append(arg2)
+            line_numbers.append(line_number)
+    return program
+
+
+def _parse_line(program: Program, line: bytes) -> Tuple[int, ...]:
+    if not (valid_bytes := line.partition(b"//")[0].strip()):
+        return ()
+    command_type, arg1, arg2 = parse_command(valid_bytes.decode())
+    return command_type.value, program.intern(arg1), NO_ARG2 if arg2 is None else arg2
 
 
 class Parser:
     def __init__(self, file_text: str):
-        self.lines = self._get_valid_lines(file_text)
+        self.lines, self.source_line_numbers = self._get_valid_lines(file_text)
         self.current_line_number = -1
         self.current_command: Command = None
 
-    def _get_valid_lines(self, file_text: str) -> List[str]:
-        return [
-            valid_text
-            for line in file_text.splitlines()
-            if (valid_text := self._get_valid_text(line))
-        ]
-
-    def _get_valid_text(self, text: str) -> str:
-        COMMENT_ID = "//"
-        if COMMENT_ID in text:
-            valid_text = text.split(COMMENT_ID)[0]
-        else:
-            valid_text = text
-
-        return valid_text.strip()
+    def _get_valid_lines(self, file_text: str) -> Tuple[List[str], List[int]]:
+        lines = []
+        source_line_numbers = []
+        for line_number, line in enumerate(file_text.splitlines(), 1):
+            if valid_text := get_valid_text(line):
+                lines.append(valid_text)
+                source_line_numbers.append(line_number)
+        return lines, source_line_numbers
 
     def has_more_lines(self):
         return self.current_line_number < len(self.lines)-1
 
     def advance(self):
         self.current_line_number += 1
-        self.current_command = Command(self.lines[self.current_line_number])
+        self.current_command = Command(self.lines[self.current_line_number],
+                                       self.source_line_numbers[self.current_line_number])
+
+    def source_line_number(self) -> int:
+        return self.current_command.line_number
 
     def command_type(self) -> CommandType:
         return self.current_command.command_type
@@ -0,0 +1,94 @@
+from collections import Counter
+from typing import List, Tuple
+
+# (name, pattern, replacement): consecutive instructions matching the pattern are replaced.
+# Comments between the instructions are kept, labels end the window.
+PEEPHOLE_RULES: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    (
+        "sp-reload-after-increment",
+        ("@SP", "M=M+1", "@SP"),
+        ("@SP", "M=M+1"),
+    ),
+    (
+        "sp-reload-after-decrement",
+        ("@SP", "M=M-1", "@SP"),
+        ("@SP", "M=M-1"),
+    ),
+    (
+        "sp-increment-decrement",
+        ("@SP", "M=M+1", "M=M-1"),
+        ("@SP",),
+    ),
+    (
+        "push-pop",
+        ("@SP", "A=M", "M=D", "@SP", "A=M", "D=M"),
+        ("@SP", "A=M", "M=D"),
+    ),
+    (
+        "sp-decrement-address",
+        ("@SP", "M=M-1", "A=M"),
+        ("@SP", "AM=M-1"),
+    ),
+]
+
+WINDOW_SIZE = max(len(pattern) for _, pattern, _ in PEEPHOLE_RULES)
+
+
+def _is_instruction(statement: str) -> bool:
+    return statement[0] not in ("(", "/")
+
+
+class PeepholeOptimizer:
+    def __init__(self):
+        self.hits = Counter()
+        self._window: List[str] = []
+        self._instruction_count = 0
+
+    def process(self, statements: List[str]) -> List[str]:
+        output = []
+        for statement in statements:
+            if statement[0] == "(":
+                output += self.flush()
+                output.append(statement)
+                continue
+
+            self._window.append(statement)
+            if _is_instruction(statement):
+                self._instruction_count += 1
+                while self._apply_rules():
+                    pass
+                while self._instruction_count > WINDOW_SIZE:
+                    output.append(self._pop_front())
+        return output
+
+    def flush(self) -> List[str]:
+        output = self._window
+        self._window = []
+        self._instruction_count = 0
+        return output
+
+    def _pop_front(self) -> str:
+        statement = self._window.pop(0)
+        if _is_instruction(statement):
+            self._instruction_count -= 1
+        return statement
+
+    def _apply_rules(self) -> bool:
+        positions = [index for index, statement in enumerate(self._window) if _is_instruction(statement)]
+        for name, pattern, replacement in PEEPHOLE_RULES:
+            if len(pattern) > len(positions):
+                continue
+
+            matched_positions = positions[-len(pattern):]
+            if all(self._window[position] == instruction for position, instruction in zip(matched_positions, pattern)):
+                self._replace(matched_positions, replacement)
+                self.hits[name] += 1
+                return True
+        return False
+
+    def _replace(self, positions: List[int], replacement: Tuple[str, ...]):
+        first = positions[0]
+        removed = set(positions)
+        comments = [statement for index, statement in enumerate(self._window[first:], first) if index not in removed]
+        self._window[first:] = [*replacement, *comments]
+        self._instruction_count += len(replacement) - len(positions)
@@ -0,0 +1,148 @@
+import sys
+import threading
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from queue import Empty, Full, Queue
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from vm_translator.command import Command, CommandFields, parse_command
+from vm_translator.folding import ConstantFolder
+from vm_translator.main import add_to_report, create_code_writer, get_label_map_path, get_output, get_output_path
+from vm_translator.options import Options
+from vm_translator.output_sink import Output
+from vm_translator.parser import LINE_CACHE_SIZE, get_valid_text
+
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_QUEUE_SIZE = 8
+# How often a stage blocked on a full or empty queue checks whether the pipeline was stopped.
+POLL_INTERVAL = 0.1
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+# Runs one stage of the pipeline: puts the items it produces on its output queue, followed by _END or the
+# error that stopped it.
+class _Stage(threading.Thread):
+    def __init__(self, items: Iterable, output: Queue, stop: threading.Event):
+        super().__init__(daemon=True)
+        self._items = items
+        self._output = output
+        self._stop_event = stop
+
+    def run(self):
+        try:
+            for item in self._items:
+                if not self._put(item):
+                    return
+        except BaseException as error:
+            self._put(_Failure(error))
+        else:
+            self._put(_END)
+
+    def _put(self, item) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self._output.put(item, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+        return False
+
+
+def iter_queue(queue: Queue, stop: threading.Event) -> Iterator:
+    while not stop.is_set():
+        try:
+            item = queue.get(timeout=POLL_INTERVAL)
+        except Empty:
+            continue
+        if item is _END:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def iter_batch_commands(line_batches: Iterable[List[str]]) -> Iterator[Command]:
+    line_number = 0
+    for lines in line_batches:
+        for line in lines:
+            line_number += 1
+            if valid_text := get_valid_text(line):
+                yield Command(valid_text, line_number)
+
+
+# Parses each distinct line once; the code generator only needs the fields of the commands.
+def iter_batch_fields(line_batches: Iterable[List[str]]) -> Iterator[CommandFields]:
+    parsed_lines: Dict[str, Optional[CommandFields]] = {}
+    for lines in line_batches:
+        for line in lines:
+            fields = parsed_lines.get(line, False)
+            if fields is False:
+                if len(parsed_lines) >= LINE_CACHE_SIZE:
+                    parsed_lines.clear()
+                valid_text = get_valid_text(line)
+                fields = parsed_lines[line] = parse_command(valid_text) if valid_text else None
+            if fields:
+                yield fields
+
+
+# Translates one file with a reader, a parser and a code generator running in their own threads, connected by
+# bounded queues of batches. The code generator is the only stage that touches the CodeWriter, so its function
+# name and branch and return indexes advance in the order of the file like in translate_file.
+def translate_pipelined(input_file: TextIO, output: Output, file_base_name: str, options=Options(),
+                        report: Optional[Counter] = None, to_hack=False, batch_size=DEFAULT_BATCH_SIZE,
+                        queue_size=DEFAULT_QUEUE_SIZE, label_map_path: Optional[Path] = None):
+    stop = threading.Event()
+    line_batches: Queue = Queue(queue_size)
+    command_batches: Queue = Queue(queue_size)
+
+    if options.fold_constants:
+        folder = ConstantFolder()
+        commands = folder.fold(iter_batch_commands(iter_queue(line_batches, stop)))
+        fields = (command.fields for command in commands)
+    else:
+        fields = iter_batch_fields(iter_queue(line_batches, stop))
+    stages = [
+        _Stage(iter_batches(input_file, batch_size), line_batches, stop),
+        _Stage(iter_batches(fields, batch_size), command_batches, stop),
+    ]
+    for stage in stages:
+        stage.start()
+
+    try:
+        with create_code_writer(get_output(output, to_hack, label_map_path), file_base_name, options) as code_writer:
+            code_writer.write_runtime()
+            for batch in iter_queue(command_batches, stop):
+                for command_fields in batch:
+                    code_writer.write_command(*command_fields)
+    finally:
+        stop.set()
+        for stage in stages:
+            stage.join()
+
+    add_to_report(report, code_writer)
+    if options.fold_constants and report is not None:
+        report[f"folded commands {file_base_name}.vm"] += folder.eliminated
+
+
+def translate_file_pipelined(input_path_str: str, to_stdout=False, options=Options(),
+                             report: Optional[Counter] = None, to_hack=False, short_labels=False,
+                             batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE) -> Optional[Path]:
+    input_path = Path(input_path_str)
+    output_path = get_output_path(input_path, to_hack)
+    with input_path.open(mode="r") as input_file:
+        translate_pipelined(input_file, sys.stdout if to_stdout else output_path, input_path.stem, options, report,
+                            to_hack, batch_size, queue_size, get_label_map_path(output_path) if short_labels else None)
+    return None if to_stdout else output_path
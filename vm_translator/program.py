@@ -0,0 +1,90 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vm_translator.command import Command, CommandType, CommandFields
+
+NO_SYMBOL = -1
+NO_ARG2 = -1
+
+_COMMAND_TYPES = {command_type.value: command_type for command_type in CommandType}
+
+
+class Program:
+    def __init__(self):
+        self.opcodes = array("B")
+        self.arg1_ids = array("i")
+        self.arg2s = array("i")
+        self.line_numbers = array("i")
+        self.symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def intern(self, symbol: Optional[str]) -> int:
+        if symbol is None:
+            return NO_SYMBOL
+
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self._symbol_ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def append(self, command_type: CommandType, arg1: Optional[str], arg2: Optional[int], line_number: int = 0):
+        self.opcodes.append(command_type.value)
+        self.arg1_ids.append(self.intern(arg1))
+        self.arg2s.append(NO_ARG2 if arg2 is None else arg2)
+        self.line_numbers.append(line_number)
+
+    def append_commands(self, commands: Iterable[Command]):
+        for command in commands:
+            self.append(*command.fields, command.line_number)
+
+    def command_type(self, index: int) -> CommandType:
+        return _COMMAND_TYPES[self.opcodes[index]]
+
+    def arg1(self, index: int) -> str:
+        symbol_id = self.arg1_ids[index]
+        return None if symbol_id == NO_SYMBOL else self.symbols[symbol_id]
+
+    def arg2(self, index: int) -> int:
+        arg2 = self.arg2s[index]
+        if arg2 == NO_ARG2:
+            raise Exception("Not supported type")
+        return arg2
+
+    def fields(self, index: int) -> CommandFields:
+        arg2 = self.arg2s[index]
+        return self.command_type(index), self.arg1(index), None if arg2 == NO_ARG2 else arg2
+
+    def iter_fields(self) -> Iterator[CommandFields]:
+        symbols = self.symbols
+        for opcode, symbol_id, arg2 in zip(self.opcodes, self.arg1_ids, self.arg2s):
+            yield (
+                _COMMAND_TYPES[opcode],
+                None if symbol_id == NO_SYMBOL else symbols[symbol_id],
+                None if arg2 == NO_ARG2 else arg2,
+            )
+
+    def get_function_ranges(self) -> List[Tuple[Optional[str], int, int]]:
+        function_opcode = CommandType.C_FUNCTION.value
+        starts = [index for index, opcode in enumerate(self.opcodes) if opcode == function_opcode]
+        ranges = []
+        if not starts or starts[0] > 0:
+            ranges.append((None, 0, starts[0] if starts else len(self)))
+        for start, stop in zip(starts, [*starts[1:], len(self)]):
+            ranges.append((self.arg1(start), start, stop))
+        return ranges
+
+    def select(self, ranges: Iterable[Tuple[int, int]]) -> "Program":
+        program = Program()
+        program.symbols = list(self.symbols)
+        program._symbol_ids = dict(self._symbol_ids)
+        for start, stop in ranges:
+            program.opcodes.extend(self.opcodes[start:stop])
+            program.arg1_ids.extend(self.arg1_ids[start:stop])
+            program.arg2s.extend(self.arg2s[start:stop])
+            program.line_numbers.extend(self.line_numbers[start:stop])
+        return program
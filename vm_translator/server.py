@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import fields
+from pathlib import Path
+from typing import TextIO
+
+from vm_translator.client import DEFAULT_SOCKET_PATH
+from vm_translator.main import get_output_path, translate, translate_to_asm_text, translate_vm_text
+from vm_translator.options import Options
+
+OPTION_NAMES = {field.name for field in fields(Options)}
+
+
+# Requests are JSON objects with either "path" (a .vm file or a folder) or "source" (VM text, named by "name").
+# Paths are translated to their usual output file unless "stdout" is set; sources always answer with the code.
+def handle_request(request: dict) -> dict:
+    start_time = time.perf_counter()
+    response = {"id": request.get("id")}
+    try:
+        options = get_options(request.get("options", {}))
+        report = Counter()
+        if "source" in request:
+            response["asm"] = translate_vm_text(request["source"], request.get("name", "Main"), options, report)
+        elif "path" in request:
+            input_path = Path(request["path"])
+            need_bootstrap = request.get("bootstrap", True) and input_path.is_dir()
+            to_hack = request.get("hack", False)
+            if not input_path.exists():
+                raise Exception(f"No such file or folder: {input_path}")
+            if request.get("stdout"):
+                response["hack" if to_hack else "asm"] = translate_to_asm_text(input_path, need_bootstrap, options,
+                                                                               report, to_hack)
+            else:
+                translate(str(input_path), need_bootstrap, options=options, report=report, to_hack=to_hack)
+                response["output_path"] = str(get_output_path(input_path, to_hack))
+        else:
+            raise Exception("Request needs a path or a source")
+        response["ok"] = True
+        response["report"] = dict(report)
+    except Exception as error:
+        response["ok"] = False
+        response["error"] = str(error)
+    response["seconds"] = time.perf_counter() - start_time
+    return response
+
+
+def get_options(values: dict) -> Options:
+    unknown_names = set(values) - OPTION_NAMES
+    if unknown_names:
+        raise Exception(f"Unknown options: {', '.join(sorted(unknown_names))}")
+
+    values = dict(values)
+    if "shared_comparisons" in values:
+        values["shared_comparisons"] = frozenset(values["shared_comparisons"])
+    if "root_functions" in values:
+        values["root_functions"] = tuple(values["root_functions"])
+    return Options(**values)
+
+
+def parse_request(line: str) -> dict:
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise Exception(f"Invalid request: {error}")
+    if not isinstance(request, dict):
+        raise Exception("Invalid request: expected a JSON object")
+    return request
+
+
+def _get_failure(request: dict, error: BaseException) -> dict:
+    return {"id": request.get("id"), "ok": False, "error": f"The request failed: {error!r}"}
+
+
+# The returned future always ends with a response, also when the request can't be parsed or its worker dies.
+def submit_request(executor: Executor, line: str) -> Future:
+    response = Future()
+    try:
+        request = parse_request(line)
+    except Exception as error:
+        response.set_result({"id": None, "ok": False, "error": str(error)})
+        return response
+
+    def set_response(future: Future):
+        try:
+            response.set_result(future.result())
+        except Exception as error:
+            response.set_result(_get_failure(request, error))
+
+    try:
+        executor.submit(handle_request, request).add_done_callback(set_response)
+    except Exception as error:
+        response.set_result(_get_failure(request, error))
+    return response
+
+
+# Answers JSON-lines requests from input_file on output_file. Requests run concurrently in the executor, so
+# responses can come back out of order and carry the "id" of their request.
+def serve_stdio(executor: Executor, input_file: TextIO, output_file: TextIO):
+    lock = threading.Lock()
+    written = threading.Semaphore(0)
+
+    def write_response(future: Future):
+        try:
+            with lock:
+                output_file.write(json.dumps(future.result()) + "\n")
+                output_file.flush()
+        finally:
+            written.release()
+
+    request_count = 0
+    for line in input_file:
+        if line.strip():
+            submit_request(executor, line).add_done_callback(write_response)
+            request_count += 1
+    for _ in range(request_count):
+        written.acquire()
+
+
+def is_server_running(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+# Only a socket left behind by a server that is gone is removed; anything else at the path stops the server.
+def prepare_socket_path(socket_path: str):
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise Exception(f"{socket_path} exists and is not a socket")
+    if is_server_running(socket_path):
+        raise Exception(f"A server is already listening on {socket_path}")
+    os.remove(socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = submit_request(self.server.executor, line.decode()).result()
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+class TranslationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, executor: Executor):
+        self.executor = executor
+        prepare_socket_path(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_bind(self):
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the translator running and answer JSON-lines requests")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, metavar="PATH",
+                        help=f"Unix socket to listen on (default: {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--stdio", action="store_true", help="Read requests from stdin and answer on stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), metavar="N",
+                        help="Number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+    if not args.stdio:
+        try:
+            prepare_socket_path(args.socket)
+        except Exception as error:
+            parser.exit(1, f"{error}\n")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.stdio:
+            serve_stdio(executor, sys.stdin, sys.stdout)
+        else:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit())
+            with TranslationServer(args.socket, executor) as server:
+                print(f"Listening on {args.socket}", file=sys.stderr)
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
@@ -0,0 +1,123 @@
+import bisect
+import json
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vm_translator.main import get_vm_files, is_whole_program, read_program, read_whole_program, translate_to_asm_text
+from vm_translator.options import Options
+
+SOURCE_MAP_VERSION = 1
+# File, function and line of instructions that don't come from a VM command, like the bootstrap code.
+NO_SOURCE = -1
+RUNTIME_COMMENT = "// runtime"
+FILE_MARKER_PREFIX = "// > "
+
+# (first ROM address, file index, line number, function index) of each run of instructions from one VM line.
+Mapping = Tuple[int, int, int, int]
+
+
+class SourceMap:
+    def __init__(self, files: List[str], functions: List[str], mappings: List[Mapping]):
+        self.files = files
+        self.functions = functions
+        self.mappings = mappings
+        self._addresses = [mapping[0] for mapping in mappings]
+
+    def lookup(self, address: int) -> Optional[Tuple[str, int, Optional[str]]]:
+        index = bisect.bisect_right(self._addresses, address) - 1
+        if index < 0:
+            return None
+
+        _, file_index, line_number, function_index = self.mappings[index]
+        if file_index == NO_SOURCE:
+            return None
+        return self.files[file_index], line_number, None if function_index == NO_SOURCE else \
+            self.functions[function_index]
+
+    def to_dict(self) -> dict:
+        return {
+            "version": SOURCE_MAP_VERSION,
+            "files": self.files,
+            "functions": self.functions,
+            "mappings": [list(mapping) for mapping in self.mappings],
+        }
+
+    def save(self, map_path: Path):
+        map_path.write_text(json.dumps(self.to_dict(), separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, map_path: Path) -> "SourceMap":
+        document = json.loads(map_path.read_text())
+        if document.get("version") != SOURCE_MAP_VERSION:
+            raise Exception(f"Unsupported source map: {map_path}")
+        return cls(document["files"], document["functions"], [tuple(mapping) for mapping in document["mappings"]])
+
+
+# Every VM command starts with one comment in the generated code, so the n-th command comment of a file
+# belongs to its n-th command. Comments of the bootstrap and runtime code come before the file commands.
+def build_source_map(asm_lines: Iterable[str], vm_files: List[Path], line_numbers: List[array],
+                     is_folder: bool) -> SourceMap:
+    file_indexes = {vm_file.stem: index for index, vm_file in enumerate(vm_files)}
+    functions: List[str] = []
+    function_indexes: Dict[str, int] = {}
+    mappings: List[Mapping] = []
+
+    address = 0
+    file_index = NO_SOURCE if is_folder else 0
+    command_index = -1
+    function_index = NO_SOURCE
+    source = (NO_SOURCE, NO_SOURCE, NO_SOURCE)
+    for line in asm_lines:
+        if line.startswith("  "):
+            if not mappings or mappings[-1][1:] != source:
+                mappings.append((address, *source))
+            address += 1
+        elif line.startswith(FILE_MARKER_PREFIX):
+            _check_command_count(vm_files, line_numbers, file_index, command_index)
+            file_index = file_indexes[line[len(FILE_MARKER_PREFIX):].strip()[:-len(".asm")]]
+            command_index = -1
+            function_index = NO_SOURCE
+            source = (NO_SOURCE, NO_SOURCE, NO_SOURCE)
+        elif line.startswith(RUNTIME_COMMENT) or file_index == NO_SOURCE:
+            source = (NO_SOURCE, NO_SOURCE, NO_SOURCE)
+        elif line.startswith("// "):
+            command_index += 1
+            words = line.split()
+            if words[1] == "function":
+                function_index = function_indexes.setdefault(words[2], len(functions))
+                if function_index == len(functions):
+                    functions.append(words[2])
+            source = (file_index, line_numbers[file_index][command_index], function_index)
+
+    _check_command_count(vm_files, line_numbers, file_index, command_index)
+    return SourceMap([vm_file.name for vm_file in vm_files], functions, mappings)
+
+
+def _check_command_count(vm_files: List[Path], line_numbers: List[array], file_index: int, command_index: int):
+    if file_index != NO_SOURCE and command_index + 1 != len(line_numbers[file_index]):
+        raise Exception(f"Generated code doesn't match the commands of {vm_files[file_index].name}")
+
+
+def get_line_numbers(vm_files: List[Path], is_folder: bool, need_bootstrap=False, options=Options()) -> List[array]:
+    if is_folder and is_whole_program(options):
+        programs = read_whole_program(vm_files, need_bootstrap, options)
+    else:
+        programs = [read_program(vm_file, options) for vm_file in vm_files]
+    return [program.line_numbers for program in programs]
+
+
+def write_source_map(input_path_str: str, map_path: Path, need_bootstrap=False, options=Options(),
+                     asm_path: Optional[Path] = None) -> SourceMap:
+    input_path = Path(input_path_str)
+    is_folder = input_path.is_dir()
+    vm_files = get_vm_files(input_path)
+    if asm_path:
+        asm_text = asm_path.read_text()
+    else:
+        asm_text = translate_to_asm_text(input_path, need_bootstrap and is_folder, options)
+
+    line_numbers = get_line_numbers(vm_files, is_folder, need_bootstrap, options)
+    source_map = build_source_map(asm_text.splitlines(), vm_files, line_numbers, is_folder)
+    source_map.save(map_path)
+    return source_map
@@ -0,0 +1,223 @@
+import io
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, TextIO
+
+from vm_translator.emulator import TOP_LEVEL_NAME
+from vm_translator.folding import ConstantFolder
+from vm_translator.main import (
+    create_code_writer,
+    get_label_map_path,
+    get_output,
+    get_output_path,
+    get_vm_files,
+    is_whole_program,
+    optimize_whole_program,
+    translate_to_text,
+    write_header,
+    write_translations,
+)
+from vm_translator.options import Options
+from vm_translator.parser import iter_commands
+from vm_translator.program import Program
+
+PHASES = ("read", "parse", "codegen", "link", "write")
+HEADER_NAME = "<header>"
+
+
+class PhaseStats:
+    def __init__(self):
+        self.seconds = Counter()
+        self.peak_memory: Optional[int] = None
+        self.command_counts = Counter()
+        self.kind_instructions = Counter()
+        self.function_instructions = Counter()
+
+    def add(self, other: "PhaseStats"):
+        self.seconds.update(other.seconds)
+        if other.peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, other.peak_memory)
+        self.command_counts.update(other.command_counts)
+        self.kind_instructions.update(other.kind_instructions)
+        self.function_instructions.update(other.function_instructions)
+
+    # Records the peak memory instead of the time while tracemalloc is tracing, because tracing slows the
+    # translation down several times and not evenly across phases.
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            yield
+            self.peak_memory = max(self.peak_memory or 0, tracemalloc.get_traced_memory()[1])
+            return
+
+        start_time = time.perf_counter()
+        yield
+        self.seconds[phase] += time.perf_counter() - start_time
+
+    def count_commands(self, program: Program):
+        self.command_counts.update(program.command_type(index).name for index in range(len(program)))
+
+    def count_instructions(self, asm_text: str):
+        kind = None
+        function_name = TOP_LEVEL_NAME
+        for line in asm_text.splitlines():
+            if line.startswith("  "):
+                self.kind_instructions[kind] += 1
+                self.function_instructions[function_name] += 1
+            elif line.startswith("// "):
+                words = line[3:].split()
+                kind = " ".join(words[:2]) if words[0] in ("push", "pop") else words[0]
+                if words[0] == "function":
+                    function_name = words[1]
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": {phase: self.seconds[phase] for phase in PHASES if phase in self.seconds},
+            **({} if self.peak_memory is None else {"peak_memory_bytes": self.peak_memory}),
+            "commands": dict(self.command_counts.most_common()),
+            "instructions_per_command_kind": dict(self.kind_instructions.most_common()),
+            "instructions_per_function": dict(self.function_instructions.most_common()),
+        }
+
+
+class TranslationStats:
+    def __init__(self):
+        self.files: Dict[str, PhaseStats] = {}
+        self.program = PhaseStats()
+
+    def get_total(self) -> PhaseStats:
+        total = PhaseStats()
+        for file_stats in self.files.values():
+            total.add(file_stats)
+        total.add(self.program)
+        return total
+
+    def to_dict(self) -> dict:
+        return {
+            "files": {name: file_stats.to_dict() for name, file_stats in self.files.items()},
+            "total": self.get_total().to_dict(),
+        }
+
+
+# Translates like main.translate, but runs each phase over all files before the next one so they can be timed.
+# With measure_memory, the phases run a second time under tracemalloc to find their peak memory.
+def translate_with_stats(input_path_str: str, need_bootstrap=False, to_stdout=False, options=Options(),
+                         report: Optional[Counter] = None, to_hack=False, short_labels=False,
+                         measure_memory=False) -> TranslationStats:
+    input_path = Path(input_path_str)
+    output_path = get_output_path(input_path, to_hack)
+    label_map_path = get_label_map_path(output_path) if short_labels else None
+    stats = TranslationStats()
+    output_text = _run_phases(input_path, stats, need_bootstrap, options, report, to_hack, label_map_path)
+
+    with stats.program.measure("write"):
+        if to_stdout:
+            sys.stdout.write(output_text)
+        else:
+            output_path.write_text(output_text)
+
+    if measure_memory:
+        memory_stats = TranslationStats()
+        tracemalloc.start()
+        try:
+            _run_phases(input_path, memory_stats, need_bootstrap, options, None, to_hack, label_map_path)
+        finally:
+            tracemalloc.stop()
+        for name, file_stats in memory_stats.files.items():
+            stats.files[name].peak_memory = file_stats.peak_memory
+        stats.program.peak_memory = memory_stats.program.peak_memory
+    return stats
+
+
+def _run_phases(input_path: Path, stats: TranslationStats, need_bootstrap: bool, options: Options,
+                report: Optional[Counter], to_hack: bool, label_map_path: Optional[Path]) -> str:
+    is_folder = input_path.is_dir()
+    vm_files = get_vm_files(input_path)
+    programs = [_read_program(vm_file, stats, options, report) for vm_file in vm_files]
+
+    if is_folder and is_whole_program(options):
+        with stats.program.measure("link"):
+            programs = optimize_whole_program(programs, vm_files, need_bootstrap, options, report)
+
+    results = []
+    for vm_file, program in zip(vm_files, programs):
+        file_stats = stats.files[vm_file.name]
+        with file_stats.measure("codegen"):
+            asm_text, file_report = translate_to_text(program, vm_file.stem, options)
+        file_stats.count_instructions(asm_text)
+        results.append((asm_text, file_report))
+
+    output = io.StringIO()
+    with stats.program.measure("link"):
+        with create_code_writer(get_output(output, to_hack, label_map_path), input_path.stem,
+                                options) as code_writer:
+            write_header(code_writer, need_bootstrap and is_folder)
+            if is_folder:
+                write_translations(code_writer, vm_files, results, report)
+            else:
+                code_writer.write_text(results[0][0])
+                if report is not None:
+                    report.update(results[0][1])
+    stats.program.count_instructions(_get_header_text(need_bootstrap and is_folder, options))
+    return output.getvalue()
+
+
+def _read_program(vm_file: Path, stats: TranslationStats, options: Options,
+                  report: Optional[Counter]) -> Program:
+    file_stats = stats.files[vm_file.name] = PhaseStats()
+    with file_stats.measure("read"):
+        text = vm_file.read_text()
+
+    with file_stats.measure("parse"):
+        program = Program()
+        commands = iter_commands(text.splitlines())
+        if options.fold_constants:
+            folder = ConstantFolder()
+            program.append_commands(folder.fold(commands))
+        else:
+            program.append_commands(commands)
+
+    if options.fold_constants and report is not None:
+        report[f"folded commands {vm_file.name}"] += folder.eliminated
+    file_stats.count_commands(program)
+    return program
+
+
+def _get_header_text(need_bootstrap: bool, options: Options) -> str:
+    output = io.StringIO()
+    with create_code_writer(output, HEADER_NAME, options) as code_writer:
+        write_header(code_writer, need_bootstrap)
+    return output.getvalue()
+
+
+def _format_counts(counts: Counter) -> str:
+    return ", ".join(f"{name} {count}" for name, count in counts.most_common())
+
+
+def _format_phase_stats(phase_stats: PhaseStats) -> str:
+    times = ", ".join(f"{phase} {phase_stats.seconds[phase] * 1000:.1f} ms"
+                      for phase in PHASES if phase in phase_stats.seconds)
+    memory = "" if phase_stats.peak_memory is None else f", peak memory {phase_stats.peak_memory / 1024:.1f} KB"
+    return f"{times}{memory}, {sum(phase_stats.command_counts.values())} commands, " \
+        f"{sum(phase_stats.kind_instructions.values())} instructions"
+
+
+def print_stats(stats: TranslationStats, file: TextIO):
+    total = stats.get_total()
+    print("Stats:", file=file)
+    for name, file_stats in stats.files.items():
+        print(f"  {name}: {_format_phase_stats(file_stats)}", file=file)
+    print(f"  total: {_format_phase_stats(total)}", file=file)
+    print(f"  commands: {_format_counts(total.command_counts)}", file=file)
+    print(f"  instructions per command kind: {_format_counts(total.kind_instructions)}", file=file)
+    print(f"  instructions per function: {_format_counts(total.function_instructions)}", file=file)
+
+
+def print_stats_json(stats: TranslationStats, file: TextIO):
+    print(json.dumps(stats.to_dict(), indent=2), file=file)
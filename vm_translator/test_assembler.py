@@ -0,0 +1,54 @@
+import unittest
+
+from vm_translator.assembler import VARIABLE_BASE, assemble, encode_c_instruction
+
+
+class TestAssembler(unittest.TestCase):
+    def test_encode_c_instruction(self):
+        self.assertEqual(encode_c_instruction("D=M"), 0b1111110000010000)
+        self.assertEqual(encode_c_instruction("AM=M-1"), 0b1111110010101000)
+        self.assertEqual(encode_c_instruction("MA=M-1"), 0b1111110010101000)
+        self.assertEqual(encode_c_instruction("0;JMP"), 0b1110101010000111)
+        self.assertEqual(encode_c_instruction("D;JNE"), 0b1110001100000101)
+        self.assertEqual(encode_c_instruction("M=M+D"), encode_c_instruction("M=D+M"))
+        with self.assertRaises(Exception):
+            encode_c_instruction("D=X")
+
+    def test_assemble(self):
+        assembly = assemble([
+            "// push static 3",
+            "  @Foo.3",
+            "  D=M",
+            "// function Foo.bar 0",
+            "(Foo.bar)",
+            "  @Foo.bar$LOOP",
+            "(Foo.bar$LOOP)",
+            "  @Foo.2",
+            "  @Foo.3",
+            "  @SP",
+            "  @7",
+        ])
+
+        self.assertEqual(list(assembly.rom), [
+            VARIABLE_BASE,
+            0b1111110000010000,
+            3,
+            VARIABLE_BASE + 1,
+            VARIABLE_BASE,
+            0,
+            7,
+        ])
+        self.assertEqual(assembly.function_starts, [(0, None), (2, "Foo.bar")])
+
+    def test_assemble_given_short_function_label(self):
+        assembly = assemble([
+            "  @SP",
+            "// function Foo.bar 0",
+            "(_0)",
+            "  @_0",
+            "(_1)",
+            "  @_1",
+        ])
+
+        self.assertEqual(list(assembly.rom), [0, 1, 2])
+        self.assertEqual(assembly.function_starts, [(0, None), (1, "Foo.bar")])
@@ -0,0 +1,29 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from vm_translator.benchmark import generate_program, run_benchmarks
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generate_program_given_seed(self):
+        with tempfile.TemporaryDirectory() as first_dir, tempfile.TemporaryDirectory() as second_dir:
+            first_files = generate_program(Path(first_dir), file_count=3, command_count=300, seed=7)
+            second_files = generate_program(Path(second_dir), file_count=3, command_count=300, seed=7)
+
+            self.assertEqual([vm_file.name for vm_file in first_files],
+                             ["Class0.vm", "Class1.vm", "Class2.vm", "Sys.vm"])
+            for first_file, second_file in zip(first_files, second_files):
+                self.assertEqual(first_file.read_text(), second_file.read_text())
+
+    def test_run_benchmarks(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            vm_files = generate_program(Path(temp_dir), file_count=2, command_count=200)
+            results = run_benchmarks(vm_files)
+
+        self.assertEqual(list(results), ["parse", "scan", "codegen", "link"])
+        for result in results.values():
+            self.assertGreater(result["commands"], 200)
+            self.assertGreater(result["commands_per_second"], 0)
+            self.assertGreater(result["bytes_per_second"], 0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
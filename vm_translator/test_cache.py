@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from vm_translator.cache import TranslationCache
+from vm_translator.options import Options
+from vm_translator.parser import parse_program
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._temp_dir.name) / "cache"
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_store_and_load(self):
+        cache = TranslationCache(self.cache_dir)
+        key = cache.get_key(Path("test_data/Add.vm"), "Add")
+
+        self.assertFalse(cache.contains(key))
+        self.assertIsNone(cache.load(key))
+        cache.store(key, "// add\n  @SP\n", Counter({"folded commands Add.vm": 2}))
+        self.assertTrue(cache.contains(key))
+        self.assertEqual(cache.load(key), ("// add\n  @SP\n", Counter({"folded commands Add.vm": 2})))
+
+    def test_get_key(self):
+        cache = TranslationCache(self.cache_dir)
+        key = cache.get_key(Path("test_data/Add.vm"), "Add")
+
+        self.assertEqual(cache.get_key(Path("test_data/Add.vm"), "Add", Options()), key)
+        self.assertNotEqual(cache.get_key(Path("test_data/Add.vm"), "Other"), key)
+        self.assertNotEqual(cache.get_key(Path("test_data/Control.vm"), "Add"), key)
+        self.assertNotEqual(cache.get_key(Path("test_data/Add.vm"), "Add", Options(peephole=True)), key)
+        self.assertEqual(cache.get_key(parse_program(["add"]), "Add"), cache.get_key(parse_program(["add"]), "Add"))
+        self.assertNotEqual(cache.get_key(parse_program(["add"]), "Add"), cache.get_key(parse_program(["sub"]), "Add"))
+
+    def test_evict_removes_least_recently_used(self):
+        cache = TranslationCache(self.cache_dir)
+        for index, key in enumerate(("a", "b", "c")):
+            cache.store(key, "x" * 10)
+            os.utime(self.cache_dir / f"{key}.json", (index, index))
+        cache = TranslationCache(self.cache_dir, max_bytes=2 * (self.cache_dir / "a.json").stat().st_size)
+        cache.load("a")
+
+        cache.evict()
+
+        self.assertTrue(cache.contains("a"))
+        self.assertFalse(cache.contains("b"))
+        self.assertTrue(cache.contains("c"))
+
+    def test_evict_removes_stale_temp_files(self):
+        cache = TranslationCache(self.cache_dir)
+        stale_path = self.cache_dir / "stale.tmp"
+        stale_path.write_text("x")
+        os.utime(stale_path, (0, 0))
+        fresh_path = self.cache_dir / "fresh.tmp"
+        fresh_path.write_text("x")
+
+        cache.evict()
+
+        self.assertFalse(stale_path.exists())
+        self.assertTrue(fresh_path.exists())
@@ -0,0 +1,59 @@
+import unittest
+
+from vm_translator.call_graph import eliminate_dead_functions, find_reachable_functions
+from vm_translator.parser import parse_program
+
+
+class TestCallGraph(unittest.TestCase):
+    def setUp(self):
+        self.programs = [
+            parse_program([
+                "function Sys.init 0",
+                "call Main.main 0",
+                "label HALT",
+                "goto HALT",
+            ]),
+            parse_program([
+                "function Main.main 0",
+                "push constant 2",
+                "call Math.double 1",
+                "return",
+                "function Main.unused 0",
+                "call Math.unused 0",
+                "return",
+            ]),
+            parse_program([
+                "function Math.double 0",
+                "push argument 0",
+                "push argument 0",
+                "add",
+                "return",
+                "function Math.unused 0",
+                "call Main.unused 0",
+                "return",
+            ]),
+        ]
+
+    def test_find_reachable_functions(self):
+        self.assertEqual(find_reachable_functions(self.programs, ["Sys.init"]),
+                         {"Sys.init", "Main.main", "Math.double"})
+        self.assertEqual(find_reachable_functions(self.programs, ["Main.unused"]),
+                         {"Main.unused", "Math.unused"})
+
+    def test_find_reachable_functions_given_top_level_calls(self):
+        programs = [parse_program(["call Math.double 1", "function Math.double 0", "return"])]
+        self.assertEqual(find_reachable_functions(programs, []), {"Math.double"})
+
+    def test_eliminate_dead_functions(self):
+        programs, dropped_functions = eliminate_dead_functions(self.programs, ["Sys.init"])
+
+        self.assertEqual(dropped_functions, {"Main.unused": 3, "Math.unused": 3})
+        self.assertEqual([len(program) for program in programs], [4, 4, 5])
+        self.assertEqual(programs[1].fields(3), self.programs[1].fields(3))
+        self.assertEqual(programs[2].arg1(0), "Math.double")
+
+    def test_eliminate_dead_functions_given_missing_root(self):
+        programs, dropped_functions = eliminate_dead_functions(self.programs, ["Main.missing"])
+
+        self.assertIs(programs, self.programs)
+        self.assertEqual(dropped_functions, {})
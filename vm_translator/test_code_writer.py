@@ -1,9 +1,19 @@
 import unittest
+import io
 import os
 from pathlib import Path
 from typing import List, Tuple
 
-from vm_translator.code_writer import CodeWriter
+from vm_translator.code_writer import (
+    CodeWriter,
+    choose_shared_comparisons,
+    INLINE_COMPARISON_SIZE,
+    SHARED_COMPARISON_CALL_SIZE,
+    SHARED_COMPARISON_ROUTINE_SIZE,
+    TEMPLATE_CACHE_SIZE,
+)
+from vm_translator.options import Options
+from vm_translator.parser import parse_program
 
 
 class TestCodeWriter(unittest.TestCase):
@@ -111,6 +121,16 @@ class TestCodeWriter(unittest.TestCase):
     def test_write_function_given_2_vars(self):
         self._test_write_function("function2", [("Main.test", 2)])
 
+    def test_write_function_given_size_policy(self):
+        out_file = "FunctionLoop.asm"
+
+        with CodeWriter(out_file, options=Options(optimize_for="size")) as cw:
+            cw.write_function("Main.test", 2)
+            cw.write_function("Main.big", 40)
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
     def test_write_label_given_file(self):
         out_file = "LabelInFile.asm"
 
@@ -207,6 +227,117 @@ class TestCodeWriter(unittest.TestCase):
         self._verify_output(out_file)
         os.remove(out_file)
 
+    def test_write_call_given_shared_routines(self):
+        out_file = "CallShared.asm"
+
+        with CodeWriter(out_file, options=Options(shared_routines=True)) as cw:
+            cw.write_function("CallShared.test", 0)
+            cw.write_call("Math.add", 2)
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
+    def test_write_return_given_shared_routines(self):
+        out_file = "ReturnShared.asm"
+
+        with CodeWriter(out_file, options=Options(shared_routines=True)) as cw:
+            cw.write_return()
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
+    def test_write_runtime_given_shared_routines(self):
+        out_file = "RuntimeShared.asm"
+
+        with CodeWriter(out_file, options=Options(shared_routines=True)) as cw:
+            cw.write_runtime()
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
+    def test_write_runtime_given_no_shared_routines(self):
+        out_file = "RuntimeEmpty.asm"
+
+        with CodeWriter(out_file) as cw:
+            cw.write_runtime()
+
+        self.assertEqual(self._load_text(out_file), "")
+        os.remove(out_file)
+
+    def test_write_arithmetic_given_shared_comparisons(self):
+        out_file = "CompareShared.asm"
+
+        with CodeWriter(out_file, options=Options(shared_comparisons=frozenset({"eq", "lt"}))) as cw:
+            cw.write_runtime()
+            cw.write_arithmetic("eq")
+            cw.write_arithmetic("gt")
+            cw.write_arithmetic("lt")
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
+    def test_comparison_sizes(self):
+        options = Options(shared_comparisons=frozenset({"eq"}))
+        self.assertEqual(self._count_instructions(lambda cw: cw.write_arithmetic("eq")), INLINE_COMPARISON_SIZE)
+        self.assertEqual(self._count_instructions(lambda cw: cw.write_arithmetic("eq"), options),
+                         SHARED_COMPARISON_CALL_SIZE)
+        self.assertEqual(self._count_instructions(lambda cw: cw.write_runtime(), options),
+                         SHARED_COMPARISON_ROUTINE_SIZE + 2)
+
+    def test_choose_shared_comparisons(self):
+        self.assertEqual(choose_shared_comparisons({"eq": 1, "gt": 2, "lt": 30}), frozenset({"gt", "lt"}))
+
+    def _count_instructions(self, write, options: Options = Options()) -> int:
+        output = io.StringIO()
+        with CodeWriter(output, "Test", options) as cw:
+            write(cw)
+        return sum(1 for line in output.getvalue().splitlines() if line.startswith("  "))
+
+    def test_write_program(self):
+        out_file = "Control.asm"
+
+        with open("test_data/Control.vm", "r") as input_file:
+            program = parse_program(input_file)
+        with CodeWriter(out_file) as cw:
+            cw.write_program(program)
+
+        self._verify_output(out_file)
+        os.remove(out_file)
+
+    def test_templates_fill_in_indexes_and_static_names(self):
+        output = io.StringIO()
+        with CodeWriter(output, "Foo") as cw:
+            cw.write_arithmetic("eq")
+            cw.write_push_pop("push", "static", 1)
+            cw.write_arithmetic("eq")
+            cw.set_file_name("Bar")
+            cw.write_push_pop("push", "static", 1)
+            cw.write_arithmetic("eq")
+        text = output.getvalue()
+
+        self.assertIn("@Foo_THEN1\n", text)
+        self.assertIn("@Foo_THEN2\n", text)
+        self.assertIn("@Bar_THEN1\n", text)
+        self.assertIn("@Foo.1\n", text)
+        self.assertIn("@Bar.1\n", text)
+
+    def test_templates_are_bounded(self):
+        commands = [("push", "constant", index) for index in range(TEMPLATE_CACHE_SIZE + 10)]
+        commands += [("push", "constant", index) for index in range(10)]
+        commands += [("pop", "static", index % 3) for index in range(10)]
+        output = io.StringIO()
+        with CodeWriter(output, "Test") as cw:
+            for command in commands:
+                cw.write_push_pop(*command)
+
+        expected_texts = []
+        for command in commands:
+            command_output = io.StringIO()
+            with CodeWriter(command_output, "Test") as cw:
+                cw.write_push_pop(*command)
+            expected_texts.append(command_output.getvalue())
+        self.assertEqual(output.getvalue(), "".join(expected_texts))
+
     def _test_write_function(self, test_name: str, commands: List[Tuple[str, int]]):
         out_file = f"{test_name}.asm"
 
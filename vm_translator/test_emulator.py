@@ -0,0 +1,77 @@
+import unittest
+import io
+from array import array
+from pathlib import Path
+
+from vm_translator.code_writer import CodeWriter
+from vm_translator.emulator import TOP_LEVEL_NAME, Emulator, load_emulator
+from vm_translator.main import link
+from vm_translator.options import Options
+
+
+class TestEmulator(unittest.TestCase):
+    def test_run_given_solution_program(self):
+        emulator = load_emulator(Path("test_data/solution_Add.asm"))
+        emulator.ram[0] = 256
+        emulator.ram[1] = 300
+        emulator.ram[300] = 5
+        emulator.ram[16] = 37
+
+        cycles = emulator.run(1000)
+
+        self.assertTrue(emulator.halted)
+        self.assertEqual(cycles, len(emulator.rom))
+        self.assertEqual(emulator.ram[0], 257)
+        self.assertEqual(emulator.ram[256], 42)
+        self.assertEqual(emulator.get_function_cycles(), {TOP_LEVEL_NAME: cycles})
+
+    def test_run_given_budget(self):
+        emulator = Emulator.from_asm(["(LOOP)", "@LOOP", "M=M+1", "@LOOP", "0;JMP"])
+
+        self.assertEqual(emulator.run(10), 10)
+        self.assertEqual(emulator.ram[0], 3)
+        self.assertEqual(emulator.run(3), 3)
+        self.assertEqual(emulator.ram[0], 3)
+        self.assertEqual(emulator.run(1), 1)
+        self.assertEqual(emulator.ram[0], 4)
+        self.assertFalse(emulator.halted)
+
+    def test_run_given_halt_loop(self):
+        emulator = Emulator.from_asm(["@5", "D=-A", "@R0", "M=D", "(END)", "@END", "0;JMP"])
+
+        self.assertEqual(emulator.run(100), 4)
+        self.assertTrue(emulator.halted)
+        self.assertEqual(emulator.ram[0], 0x10000 - 5)
+
+    def test_run_given_translated_program(self):
+        for options in (Options(), Options(shared_routines=True, cache_top_of_stack=True, peephole=True,
+                                           shared_comparisons=frozenset({"lt"}))):
+            emulator = self._run_fibonacci(options)
+
+            self.assertTrue(emulator.halted)
+            self.assertEqual(emulator.ram[16], 55)
+            self.assertGreater(emulator.get_function_cycles()["Main.fib"], 0)
+
+    def test_run_given_locals_loop(self):
+        output = io.StringIO()
+        with CodeWriter(output, "Main", Options(optimize_for="size")) as code_writer:
+            code_writer.write_function("Main.main", 40)
+            code_writer.write_push_pop("push", "local", 39)
+        emulator = Emulator.from_asm(output.getvalue().splitlines())
+        emulator.ram[0] = 256
+        emulator.ram[1] = 256
+        emulator.ram[256:300] = array("H", [7] * 44)
+
+        emulator.run(1000)
+
+        self.assertEqual(emulator.ram[0], 297)
+        self.assertEqual(list(emulator.ram[256:297]), [0] * 41)
+        self.assertEqual(emulator.ram[297], 7)
+
+    def _run_fibonacci(self, options: Options) -> Emulator:
+        output = io.StringIO()
+        link(output, "Fib", [Path("test_data/Fibonacci/Sys.vm"), Path("test_data/Fibonacci/Main.vm")], True,
+             options=options)
+        emulator = Emulator.from_asm(output.getvalue().splitlines())
+        emulator.run(1_000_000)
+        return emulator
@@ -0,0 +1,56 @@
+import unittest
+
+from vm_translator.folding import ConstantFolder, evaluate
+from vm_translator.parser import iter_commands
+
+
+class TestConstantFolder(unittest.TestCase):
+    def test_fold_given_constant_arithmetic(self):
+        self._test_fold([
+            "push constant 2",
+            "push constant 3",
+            "add",
+            "push constant 4",
+            "sub",
+        ], [
+            "push constant 1",
+        ], 4)
+
+    def test_fold_given_comparison(self):
+        self._test_fold(["push constant 7", "push constant 3", "gt"], ["push constant 0", "not"], 1)
+        self._test_fold(["push constant 7", "push constant 3", "lt"], ["push constant 0"], 2)
+
+    def test_fold_given_identity(self):
+        self._test_fold(["push local 0", "push constant 0", "add"], ["push local 0"], 2)
+        self._test_fold(["push local 0", "push constant 1", "add"], ["push local 0", "push constant 1", "add"], 0)
+
+    def test_fold_given_double_unary(self):
+        self._test_fold(["push local 0", "not", "not", "neg", "neg", "neg"], ["push local 0", "neg"], 4)
+        self._test_fold(["push local 0", "not", "neg"], ["push local 0", "not", "neg"], 0)
+
+    def test_fold_does_not_cross_labels(self):
+        commands = ["push constant 1", "label LOOP", "push constant 2", "add"]
+        self._test_fold(commands, commands, 0)
+
+    def test_fold_keeps_line_numbers(self):
+        lines = ["push local 0", "push constant 2", "push constant 3", "add", "neg", "add"]
+        folded_lines = ["push local 0", "push constant 4", "not", "add"]
+        commands = list(ConstantFolder().fold(iter_commands(lines)))
+
+        self.assertEqual([command.fields for command in commands],
+                         [command.fields for command in iter_commands(folded_lines)])
+        self.assertEqual([command.line_number for command in commands], [1, 5, 5, 6])
+
+    def test_evaluate_wraps_to_16_bits(self):
+        self.assertEqual(evaluate("add", 32767, 1), -32768)
+        self.assertEqual(evaluate("neg", -32768), -32768)
+        self.assertEqual(evaluate("gt", 32767, -1), 0)
+        self.assertEqual(evaluate("not", 0), -1)
+
+    def _test_fold(self, lines, expected_lines, eliminated):
+        folder = ConstantFolder()
+        commands = list(folder.fold(iter_commands(lines)))
+
+        self.assertEqual([command.fields for command in commands],
+                         [command.fields for command in iter_commands(expected_lines)])
+        self.assertEqual(folder.eliminated, eliminated)
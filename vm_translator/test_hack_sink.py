@@ -0,0 +1,51 @@
+import unittest
+import io
+
+from vm_translator.assembler import VARIABLE_BASE, assemble
+from vm_translator.code_writer import CodeWriter
+from vm_translator.hack_sink import HackSink
+from vm_translator.options import Options
+
+
+class TestHackSink(unittest.TestCase):
+    def test_close_given_forward_labels_and_variables(self):
+        output = io.StringIO()
+        sink = HackSink(output)
+        sink.write("  @Foo.1\n  @END\n  0;JMP\n")
+        sink.write("// comment\n  @Foo.0\n")
+        sink.write("(END)\n  @Foo.1\n  @SP\n")
+        sink.close()
+
+        self.assertEqual(output.getvalue().splitlines(), [
+            f"{VARIABLE_BASE:016b}",
+            f"{4:016b}",
+            "1110101010000111",
+            f"{VARIABLE_BASE + 1:016b}",
+            f"{VARIABLE_BASE:016b}",
+            f"{0:016b}",
+        ])
+
+    def test_close_given_address_out_of_range(self):
+        sink = HackSink(io.StringIO())
+        sink.write("  @END\n" * 0x8000 + "(END)\n")
+
+        with self.assertRaises(Exception):
+            sink.close()
+
+    def test_code_writer_given_hack_sink(self):
+        for options in (Options(), Options(peephole=True, shared_routines=True)):
+            asm_output = io.StringIO()
+            hack_output = io.StringIO()
+            for output in (asm_output, HackSink(hack_output)):
+                with CodeWriter(output, "Test", options) as cw:
+                    cw.write_runtime()
+                    cw.write_function("Test.main", 1)
+                    cw.write_label("LOOP")
+                    cw.write_push_pop("push", "static", 3)
+                    cw.write_arithmetic("lt")
+                    cw.write_if("LOOP")
+                    cw.write_call("Test.main", 0)
+                    cw.write_return()
+
+            words = assemble(asm_output.getvalue().splitlines()).rom
+            self.assertEqual(hack_output.getvalue(), "".join(f"{word:016b}\n" for word in words))
@@ -0,0 +1,133 @@
+import unittest
+import io
+from collections import Counter
+from pathlib import Path
+
+from vm_translator.emulator import Emulator
+from vm_translator.inlining import get_leaf_function, inline_leaf_functions
+from vm_translator.main import get_vm_files, link
+from vm_translator.options import Options
+from vm_translator.parser import parse_program
+
+
+class TestInlining(unittest.TestCase):
+    def test_inline_leaf_functions(self):
+        programs = [
+            parse_program([
+                "function Main.main 0",
+                "push constant 2000",
+                "call Point.getX 1",
+                "return",
+            ]),
+            parse_program([
+                "function Point.getX 0",
+                "push argument 0",
+                "pop pointer 0",
+                "push this 0",
+                "return",
+            ]),
+        ]
+        inlined_programs, inlined_calls = inline_leaf_functions(programs, ["Main", "Point"], 8)
+
+        self.assertEqual(inlined_calls, Counter({"Point.getX in Main.main": 1}))
+        self.assertIs(inlined_programs[1], programs[1])
+        self.assertEqual(list(inlined_programs[0].iter_fields()), list(parse_program([
+            "function Main.main 0",
+            "push constant 2000",
+            "pop temp 6",
+            "push pointer 0",
+            "push temp 6",
+            "pop pointer 0",
+            "push this 0",
+            "pop temp 7",
+            "pop pointer 0",
+            "push temp 7",
+            "return",
+        ]).iter_fields()))
+        self.assertEqual(set(inlined_programs[0].line_numbers[2:10]), {3})
+
+    def test_inline_leaf_functions_renames_labels(self):
+        program = parse_program([
+            "function Main.main 0",
+            "push constant 1",
+            "call Main.isZero 1",
+            "push constant 2",
+            "call Main.isZero 1",
+            "return",
+            "function Main.isZero 0",
+            "push argument 0",
+            "if-goto ELSE",
+            "push constant 0",
+            "not",
+            "return",
+            "label ELSE",
+            "push constant 0",
+            "return",
+        ])
+        inlined_programs, _ = inline_leaf_functions([program], ["Main"], 8)
+        labels = [arg1 for _, arg1, _ in inlined_programs[0].iter_fields() if arg1 and arg1.startswith("$")]
+
+        self.assertEqual(labels, [
+            "$inline0$ELSE", "$inline0", "$inline0$ELSE", "$inline0",
+            "$inline1$ELSE", "$inline1", "$inline1$ELSE", "$inline1",
+        ])
+
+    def test_get_leaf_function_given_ineligible_functions(self):
+        for lines in (
+            ["function A.f 0", "push argument 0", "call A.g 1", "return"],
+            ["function A.f 1", "push local 0", "return"],
+            ["function A.f 0", "push constant 1", "pop temp 0", "push temp 0", "return"],
+            ["function A.f 0", "push constant 1", "push constant 2", "return"],
+            ["function A.f 0", "pop argument 0", "push constant 1", "return"],
+            ["function A.f 0", "label LOOP", "push constant 1", "goto LOOP"],
+            ["function A.f 0", *["push constant 0", "pop static 0"] * 5, "push constant 0", "return"],
+        ):
+            program = parse_program(lines)
+            self.assertIsNone(get_leaf_function(program, 0, len(program), "A", 8), lines)
+
+    def test_inline_leaf_functions_keeps_callers_temps(self):
+        programs = [
+            parse_program(["function Main.main 0", "push constant 1", "call Math.double 1", "push temp 7", "return"]),
+            parse_program(["function Math.double 0", "push argument 0", "push argument 0", "add", "return"]),
+        ]
+        inlined_programs, inlined_calls = inline_leaf_functions(programs, ["Main", "Math"], 8)
+
+        self.assertEqual(inlined_calls, Counter())
+        self.assertIs(inlined_programs[0], programs[0])
+
+    def test_inline_leaf_functions_keeps_temps_of_other_functions(self):
+        programs = [
+            parse_program(["function Main.main 0", "push constant 1", "pop temp 7", "call Main.run 0", "pop temp 0",
+                           "push temp 7", "return", "function Main.run 0", "push constant 2", "call Math.double 1",
+                           "return"]),
+            parse_program(["function Math.double 0", "push argument 0", "push argument 0", "add", "return"]),
+        ]
+        inlined_programs, inlined_calls = inline_leaf_functions(programs, ["Main", "Math"], 8)
+
+        self.assertEqual(inlined_calls, Counter())
+        self.assertIs(inlined_programs[0], programs[0])
+
+    def test_inline_leaf_functions_given_static_in_other_file(self):
+        programs = [
+            parse_program(["function Main.main 0", "call Counter.get 0", "return"]),
+            parse_program(["function Counter.get 0", "push static 0", "return"]),
+        ]
+        _, inlined_calls = inline_leaf_functions(programs, ["Main", "Counter"], 8)
+
+        self.assertEqual(inlined_calls, Counter())
+
+    def test_link_given_inlining(self):
+        vm_files = get_vm_files(Path("test_data/Inline"))
+        emulators = []
+        for options in (Options(), Options(inline_threshold=12), Options(inline_threshold=12, cache_top_of_stack=True)):
+            output = io.StringIO()
+            report = Counter()
+            link(output, "Inline", vm_files, True, options=options, report=report)
+            emulator = Emulator.from_asm(output.getvalue().splitlines())
+            emulator.run(100_000)
+            emulators.append(emulator)
+
+            self.assertTrue(emulator.halted)
+            self.assertEqual(list(emulator.ram[16:21]), [3, 4, 7, 9, 13])
+        self.assertEqual(report["inlined call Math.max in Main.main"], 2)
+        self.assertLess(emulators[1].cycles, emulators[0].cycles)
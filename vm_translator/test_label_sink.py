@@ -0,0 +1,85 @@
+import unittest
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from vm_translator.emulator import Emulator
+from vm_translator.label_sink import ShortLabelSink, get_short_label, is_label
+from vm_translator.main import link, translate_folder
+from vm_translator.options import Options
+
+
+class TestLabelSink(unittest.TestCase):
+    def test_is_label(self):
+        self.assertTrue(is_label("Main.fib"))
+        self.assertTrue(is_label("Main.fib$ret.12"))
+        self.assertTrue(is_label("Main.fib$IF_TRUE"))
+        self.assertTrue(is_label("Main_THEN3"))
+        self.assertFalse(is_label("Main.3"))
+        self.assertFalse(is_label("SP"))
+        self.assertFalse(is_label("R13"))
+
+    def test_get_short_label(self):
+        self.assertEqual([get_short_label(number) for number in (0, 9, 10, 35, 36, 1299)],
+                         ["_0", "_9", "_a", "_z", "_10", "_103"])
+
+    def test_write_given_labels(self):
+        output = io.StringIO()
+        sink = ShortLabelSink(output)
+        sink.write("// function Main.fib 0\n(Main.fib)\n  @Main.fib$ret.1\n  D=A\n")
+        sink.write("  @Main.2\n  M=D\n  @$CALL\n  0;JMP\n(Main.fib$ret.1)\n  @Main.fib\n  @SP\n")
+        sink.close()
+
+        self.assertEqual(output.getvalue().splitlines(), [
+            "// function Main.fib 0",
+            "(_0)",
+            "  @_1",
+            "  D=A",
+            "  @Main.2",
+            "  M=D",
+            "  @$CALL",
+            "  0;JMP",
+            "(_1)",
+            "  @_0",
+            "  @SP",
+        ])
+        self.assertEqual(sink.get_label_map(), {"_0": "Main.fib", "_1": "Main.fib$ret.1"})
+
+    def test_translate_folder_given_short_labels(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = Path(temp_dir) / "Fib"
+            folder.mkdir()
+            for vm_file in Path("test_data/Fibonacci").glob("*.vm"):
+                (folder / vm_file.name).write_text(vm_file.read_text())
+
+            output_path = translate_folder(folder, True, short_labels=True)
+
+            asm_lines = output_path.read_text().splitlines()
+            label_map = json.loads((folder / "Fib.asm.labels").read_text())
+            self.assertNotIn("(Main.fib)", asm_lines)
+            self.assertIn("Main.fib", label_map.values())
+            self.assertIn("Sys.init", label_map.values())
+            for short_label in label_map:
+                self.assertIn(f"({short_label})", asm_lines)
+
+    def test_run_given_short_labels(self):
+        for options in (Options(), Options(shared_routines=True, cache_top_of_stack=True, peephole=True,
+                                           shared_comparisons=frozenset({"lt"}))):
+            vm_files = [Path("test_data/Fibonacci/Sys.vm"), Path("test_data/Fibonacci/Main.vm")]
+            output = io.StringIO()
+            link(output, "Fib", vm_files, True, options=options)
+            short_output = io.StringIO()
+            link(ShortLabelSink(short_output), "Fib", vm_files, True, options=options)
+            emulator = Emulator.from_asm(output.getvalue().splitlines())
+            short_emulator = Emulator.from_asm(short_output.getvalue().splitlines())
+
+            self.assertLess(len(short_output.getvalue()), len(output.getvalue()))
+            self.assertEqual(short_emulator.run(1_000_000), emulator.run(1_000_000))
+            self.assertTrue(short_emulator.halted)
+            self.assertEqual(short_emulator.ram[16], 55)
+            self.assertEqual(short_emulator.get_function_cycles(), emulator.get_function_cycles())
+
+
+if __name__ == "__main__":
+    unittest.main()
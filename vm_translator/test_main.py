@@ -1,7 +1,13 @@
 import unittest
+import io
 import os
+import tempfile
+from collections import Counter
 from pathlib import Path
 import vm_translator.main as main
+from vm_translator.assembler import assemble
+from vm_translator.cache import TranslationCache
+from vm_translator.options import Options
 
 
 class TestMain(unittest.TestCase):
@@ -20,10 +26,98 @@ class TestMain(unittest.TestCase):
     def test_main_given_multi_comparison_commands(self):
         self._test_vm("TestInternalSymbol")
 
-    def _test_vm(self, test_dest: str):
+    def test_main_given_folder_and_jobs(self):
+        self._test_vm("TestFolder", jobs=2)
+
+    def test_link_given_cached_top_of_stack_across_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            vm_files = [Path(temp_dir) / "A.vm", Path(temp_dir) / "B.vm"]
+            vm_files[0].write_text("push constant 1\npush constant 2\n")
+            vm_files[1].write_text("add\n")
+            for options in (Options(cache_top_of_stack=True), Options(cache_top_of_stack=True, peephole=True)):
+                outputs = []
+                for jobs in (1, 2):
+                    out_file = io.StringIO()
+                    main.link(out_file, "Test", vm_files, jobs=jobs, options=options)
+                    outputs.append(out_file.getvalue())
+
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertLess(outputs[0].index("M=D"), outputs[0].index("// > B.asm"))
+
+    def test_link_given_stream(self):
+        out_file = io.StringIO()
+        vm_files = sorted(Path("test_data/TestFolder").glob("*.vm"))
+        main.link(out_file, "TestFolder", vm_files)
+
+        with open("test_data/solution_TestFolder.asm", "r") as solution_file:
+            self.assertEqual(out_file.getvalue(), solution_file.read())
+
+    def test_count_instructions_given_shared_routines(self):
+        inline_count = main.count_instructions("test_data/TestFolder", need_bootstrap=True)
+        shared_count = main.count_instructions("test_data/TestFolder", need_bootstrap=True,
+                                               options=Options(shared_routines=True))
+
+        self.assertEqual(inline_count, 273)
+        self.assertLess(shared_count, inline_count)
+
+    def test_resolve_shared_comparisons(self):
+        self.assertEqual(main.resolve_shared_comparisons("test_data/Add.vm", "inline"), frozenset())
+        self.assertEqual(main.resolve_shared_comparisons("test_data/Add.vm", "shared"), frozenset({"eq", "gt", "lt"}))
+        self.assertEqual(main.resolve_shared_comparisons("test_data/TestInternalSymbol", "auto"), frozenset())
+
+    def test_link_given_dead_function_elimination(self):
+        out_file = io.StringIO()
+        report = Counter()
+        vm_files = sorted(Path("test_data/TestFolder").glob("*.vm"))
+        options = Options(eliminate_dead_functions=True, root_functions=("Main.main",))
+        main.link(out_file, "TestFolder", vm_files, options=options, report=report)
+
+        with open("test_data/solution_TestFolder.asm", "r") as solution_file:
+            self.assertEqual(out_file.getvalue(), solution_file.read())
+        self.assertEqual(report, Counter())
+
+        out_file = io.StringIO()
+        options = Options(eliminate_dead_functions=True, root_functions=("Math.add",))
+        main.link(out_file, "TestFolder", vm_files, options=options, report=report)
+
+        self.assertNotIn("(Main.main)", out_file.getvalue())
+        self.assertEqual(report, Counter({"dropped function Main.main": 5}))
+
+    def test_translate_folder_given_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TranslationCache(Path(cache_dir))
+            for expected_report in ({"cache misses": 2}, {"cache hits": 2}):
+                report = Counter()
+                self._test_vm("TestFolder", cache=cache, report=report)
+                self.assertEqual(report, expected_report)
+
+    def test_translate_folder_given_cache_and_folding(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = Path(temp_dir) / "Fold"
+            folder.mkdir()
+            (folder / "Main.vm").write_text("push constant 2\npush constant 3\nadd\n")
+            cache = TranslationCache(Path(temp_dir) / "cache")
+            reports = []
+            for _ in range(2):
+                report = Counter()
+                main.translate_folder(folder, options=Options(fold_constants=True), report=report, cache=cache)
+                reports.append(report)
+
+        self.assertEqual(reports, [Counter({"folded commands Main.vm": 2, "cache misses": 1}),
+                                   Counter({"folded commands Main.vm": 2, "cache hits": 1})])
+
+    def test_translate_folder_given_hack_output(self):
+        out_file_path = main.translate_folder(Path("test_data/TestFolder"), to_hack=True)
+
+        with open("test_data/solution_TestFolder.asm", "r") as solution_file:
+            words = assemble(solution_file).rom
+        self.assertEqual(out_file_path.read_text(), "".join(f"{word:016b}\n" for word in words))
+        os.remove(out_file_path)
+
+    def _test_vm(self, test_dest: str, **kwargs):
         test_name = Path(test_dest).stem
         is_folder = test_name == test_dest
-        main.translate(f"test_data/{test_dest}")
+        main.translate(f"test_data/{test_dest}", **kwargs)
 
         out_file_path = f"test_data/{test_name}/{test_name}.asm" if is_folder else \
             f"test_data/{test_name}.asm"
@@ -0,0 +1,72 @@
+import unittest
+import io
+import os
+import tempfile
+from pathlib import Path
+
+from vm_translator.code_writer import CodeWriter
+from vm_translator.output_sink import OutputSink
+
+
+class WriteCountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.write_count = 0
+
+    def write(self, text: str) -> int:
+        self.write_count += 1
+        return super().write(text)
+
+
+class TestOutputSink(unittest.TestCase):
+    def test_write_given_small_buffer(self):
+        stream = WriteCountingStream()
+        sink = OutputSink(stream, buffer_size=10)
+
+        for _ in range(6):
+            sink.write("abcd\n")
+        self.assertEqual(stream.write_count, 3)
+        sink.close()
+
+        self.assertEqual(stream.getvalue(), "abcd\n" * 6)
+        self.assertFalse(stream.closed)
+
+    def test_write_given_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_path = Path(temp_dir) / "Out.asm"
+            sink = OutputSink(out_path)
+            sink.write("@SP\n")
+            self.assertEqual(out_path.read_text(), "")
+            sink.close()
+
+            self.assertEqual(out_path.read_text(), "@SP\n")
+            self.assertTrue(sink.closed)
+
+    def test_write_given_binary_stream(self):
+        stream = io.BytesIO()
+        with CodeWriter(stream, "Test") as cw:
+            cw.write_push_pop("push", "constant", 7)
+
+        self.assertEqual(stream.getvalue(), self._translate_to_text().encode())
+
+    def test_write_given_bytearray(self):
+        output = bytearray()
+        with CodeWriter(output, "Test") as cw:
+            cw.write_push_pop("push", "constant", 7)
+
+        self.assertEqual(output.decode(), self._translate_to_text())
+
+    def test_write_given_binary_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_path = os.path.join(temp_dir, "Test.asm")
+            with open(out_path, "wb") as out_file, CodeWriter(out_file, "Test") as cw:
+                cw.write_push_pop("push", "constant", 7)
+
+            with open(out_path) as out_file:
+                self.assertEqual(out_file.read(), self._translate_to_text())
+
+    def _translate_to_text(self) -> str:
+        output = io.StringIO()
+        with CodeWriter(output, "Test") as cw:
+            cw.write_push_pop("push", "constant", 7)
+        return output.getvalue()
@@ -1,6 +1,9 @@
 import unittest
+import io
+import tempfile
+from pathlib import Path
 
-from vm_translator.parser import Parser
+from vm_translator.parser import Parser, iter_commands, parse_program, scan_lines, scan_program
 from vm_translator.command import CommandType
 
 
@@ -35,6 +38,13 @@ class TestParser(unittest.TestCase):
         parser.advance()
         self.assertFalse(parser.has_more_lines())
 
+    def test_source_line_number(self):
+        parser = Parser("// comment\n\npush constant 17\n  add\n")
+        parser.advance()
+        self.assertEqual(parser.source_line_number(), 3)
+        parser.advance()
+        self.assertEqual(parser.source_line_number(), 4)
+
     def test_advance_given_two_lines(self):
         parser = Parser("push constant 17\npush local 2")
         self.assertTrue(parser.has_more_lines())
@@ -136,3 +146,51 @@ class TestParser(unittest.TestCase):
         parser.advance()
         self.assertEqual(parser.arg1(), "FUNC")
         self.assertEqual(parser.arg2(), 0)
+
+
+class TestIterCommands(unittest.TestCase):
+    def test_iter_commands_given_file(self):
+        input_file = io.StringIO("// comment\npush constant 7\n\n  add // sum\r\nreturn\n")
+        commands = list(iter_commands(input_file))
+
+        self.assertEqual([command.command_type for command in commands], [
+            CommandType.C_PUSH,
+            CommandType.C_ARITHMETIC,
+            CommandType.C_RETURN,
+        ])
+        self.assertEqual(commands[0].arg1, "constant")
+        self.assertEqual(commands[0].arg2, 7)
+        self.assertEqual(commands[1].arg1, "add")
+        self.assertEqual([command.line_number for command in commands], [2, 4, 5])
+
+    def test_iter_commands_reads_lazily(self):
+        input_file = io.StringIO("push constant 1\npush constant 2\n")
+        commands = iter_commands(input_file)
+
+        self.assertEqual(next(commands).arg2, 1)
+        self.assertEqual(input_file.readline(), "push constant 2\n")
+
+
+class TestScanProgram(unittest.TestCase):
+    def test_scan_lines_matches_parse_program(self):
+        text = "// comment\r\npush constant 7 // seven\r\n\n  add//sum\nlabel LOOP\npush constant 7\nreturn"
+        expected = parse_program(io.StringIO(text))
+        program = scan_lines(io.BytesIO(text.encode()))
+
+        self.assertEqual(list(program.iter_fields()), list(expected.iter_fields()))
+        self.assertEqual(list(program.line_numbers), [2, 4, 5, 6, 7])
+        self.assertEqual(program.symbols, ["constant", "add", "LOOP"])
+
+    def test_scan_program(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            vm_file = Path(temp_dir) / "Main.vm"
+            vm_file.write_text("function Main.main 0\npush constant 1\nreturn\n")
+            empty_file = Path(temp_dir) / "Empty.vm"
+            empty_file.write_text("")
+
+            self.assertEqual(list(scan_program(vm_file).iter_fields()), [
+                (CommandType.C_FUNCTION, "Main.main", 0),
+                (CommandType.C_PUSH, "constant", 1),
+                (CommandType.C_RETURN, None, None),
+            ])
+            self.assertEqual(len(scan_program(empty_file)), 0)
@@ -0,0 +1,80 @@
+import unittest
+import io
+
+from vm_translator.code_writer import CodeWriter
+from vm_translator.options import Options
+from vm_translator.peephole import PeepholeOptimizer
+
+
+class TestPeepholeOptimizer(unittest.TestCase):
+    def test_process_given_push_pop(self):
+        optimizer = PeepholeOptimizer()
+        statements = [
+            "// push constant 7",
+            "@7", "D=A", "@SP", "A=M", "M=D", "@SP", "M=M+1",
+            "// pop temp 0",
+            "@SP", "M=M-1", "A=M", "D=M",
+        ]
+
+        output = optimizer.process(statements) + optimizer.flush()
+
+        self.assertEqual(output, [
+            "// push constant 7",
+            "@7", "D=A", "@SP", "A=M", "M=D",
+            "// pop temp 0",
+        ])
+        self.assertEqual(optimizer.hits, {
+            "sp-reload-after-increment": 1,
+            "sp-increment-decrement": 1,
+            "push-pop": 1,
+        })
+
+    def test_process_given_decrement_address(self):
+        optimizer = PeepholeOptimizer()
+
+        output = optimizer.process(["@SP", "M=M-1", "A=M", "D=M"]) + optimizer.flush()
+
+        self.assertEqual(output, ["@SP", "AM=M-1", "D=M"])
+        self.assertEqual(optimizer.hits, {"sp-decrement-address": 1})
+
+    def test_process_does_not_cross_labels(self):
+        optimizer = PeepholeOptimizer()
+        statements = ["@SP", "M=M+1", "(LOOP)", "@SP", "M=M-1"]
+
+        output = optimizer.process(statements) + optimizer.flush()
+
+        self.assertEqual(output, statements)
+        self.assertEqual(optimizer.hits, {})
+
+    def test_process_holds_only_a_window(self):
+        optimizer = PeepholeOptimizer()
+
+        output = optimizer.process([f"@{index}" for index in range(20)])
+
+        self.assertEqual(output, [f"@{index}" for index in range(14)])
+        self.assertEqual(optimizer.flush(), [f"@{index}" for index in range(14, 20)])
+
+
+class TestCodeWriterWithPeephole(unittest.TestCase):
+    def test_write_push_pop_given_peephole(self):
+        output = io.StringIO()
+        with CodeWriter(output, "Test", Options(peephole=True)) as cw:
+            cw.write_push_pop("push", "local", 1)
+            cw.write_push_pop("pop", "pointer", 0)
+
+        self.assertEqual(output.getvalue(), "\n".join([
+            "// push local 1",
+            "  @LCL",
+            "  D=M",
+            "  @1",
+            "  A=D+A",
+            "  D=M",
+            "  @SP",
+            "  A=M",
+            "  M=D",
+            "// pop pointer 0",
+            "  @THIS",
+            "  M=D",
+            "",
+        ]))
+        self.assertEqual(cw.peephole_hits["push-pop"], 1)
@@ -0,0 +1,48 @@
+import unittest
+import io
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from vm_translator.benchmark import generate_program
+from vm_translator.main import translate_file
+from vm_translator.options import Options
+from vm_translator.pipeline import translate_file_pipelined, translate_pipelined
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_translate_file_pipelined(self):
+        vm_file = self.folder / "Control.vm"
+        shutil.copy("test_data/Control.vm", vm_file)
+
+        output_path = translate_file_pipelined(str(vm_file), batch_size=3, queue_size=1)
+
+        self.assertEqual(output_path, self.folder / "Control.asm")
+        self.assertEqual(output_path.read_text(), Path("test_data/solution_Control.asm").read_text())
+
+    def test_translate_pipelined_matches_translate_file(self):
+        vm_file = generate_program(self.folder, file_count=1, command_count=2000)[0]
+        for options in (Options(), Options(fold_constants=True, cache_top_of_stack=True, peephole=True)):
+            expected_report = Counter()
+            expected_path = translate_file(str(vm_file), options=options, report=expected_report)
+            report = Counter()
+            output = io.StringIO()
+            with vm_file.open() as input_file:
+                translate_pipelined(input_file, output, vm_file.stem, options, report, batch_size=16, queue_size=2)
+
+            self.assertEqual(output.getvalue(), expected_path.read_text())
+            self.assertEqual(report, expected_report)
+
+    def test_translate_pipelined_given_invalid_command(self):
+        lines = [f"push constant {index}\n" for index in range(100)] + ["push constant x\n", "add\n"]
+
+        with self.assertRaises(ValueError):
+            translate_pipelined(io.StringIO("".join(lines)), io.StringIO(), "Main", batch_size=4, queue_size=1)
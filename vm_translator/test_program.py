@@ -0,0 +1,53 @@
+import unittest
+
+from vm_translator.parser import parse_program
+from vm_translator.command import CommandType
+
+
+class TestProgram(unittest.TestCase):
+    def test_parse_program(self):
+        program = parse_program([
+            "function Main.main 2",
+            "push local 1 // comment",
+            "",
+            "label LOOP",
+            "push local 0",
+            "add",
+            "return",
+        ])
+
+        self.assertEqual(len(program), 6)
+        self.assertEqual(program.command_type(0), CommandType.C_FUNCTION)
+        self.assertEqual(program.arg1(0), "Main.main")
+        self.assertEqual(program.arg2(0), 2)
+        self.assertEqual(program.fields(1), (CommandType.C_PUSH, "local", 1))
+        self.assertEqual(program.fields(5), (CommandType.C_RETURN, None, None))
+        self.assertEqual(list(program.line_numbers), [1, 2, 4, 5, 6, 7])
+
+    def test_symbols_are_interned(self):
+        program = parse_program(["push local 0", "push local 1", "pop local 2"])
+
+        self.assertEqual(program.symbols, ["local"])
+        self.assertEqual(list(program.arg1_ids), [0, 0, 0])
+
+    def test_arg2_given_invalid_type(self):
+        program = parse_program(["sub"])
+        with self.assertRaises(Exception):
+            program.arg2(0)
+
+    def test_iter_fields(self):
+        lines = ["push constant 7", "call Math.add 2", "if-goto END"]
+        program = parse_program(lines)
+
+        self.assertEqual(list(program.iter_fields()), [
+            (CommandType.C_PUSH, "constant", 7),
+            (CommandType.C_CALL, "Math.add", 2),
+            (CommandType.C_IF, "END", None),
+        ])
+
+    def test_select_keeps_line_numbers(self):
+        program = parse_program(["function A.f 0", "return", "", "function B.g 0", "return"])
+        selected = program.select([(2, 4)])
+
+        self.assertEqual(selected.arg1(0), "B.g")
+        self.assertEqual(list(selected.line_numbers), [4, 5])
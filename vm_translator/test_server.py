@@ -0,0 +1,139 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest import mock
+
+from vm_translator.client import get_default_socket_path, send_request
+from vm_translator.server import TranslationServer, handle_request, serve_stdio
+
+
+class _BrokenExecutor(Executor):
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_exception(BrokenProcessPool("A worker died"))
+        return future
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self._temp_dir.name) / "TestFolder"
+        shutil.copytree("test_data/TestFolder", self.folder)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_handle_request_given_folder(self):
+        response = handle_request({"id": 1, "path": str(self.folder), "bootstrap": False})
+
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["id"], 1)
+        self.assertEqual(response["output_path"], str(self.folder / "TestFolder.asm"))
+        self.assertEqual((self.folder / "TestFolder.asm").read_text(),
+                         Path("test_data/solution_TestFolder.asm").read_text())
+        self.assertGreater(response["seconds"], 0)
+
+    def test_handle_request_given_source(self):
+        response = handle_request({
+            "source": "push constant 2\npush constant 3\nadd\n",
+            "name": "Add",
+            "options": {"fold_constants": True},
+        })
+
+        self.assertTrue(response["ok"])
+        self.assertIn("// push constant 5", response["asm"])
+        self.assertNotIn("// add", response["asm"])
+        self.assertEqual(response["report"], {"folded commands Add.vm": 2})
+
+    def test_handle_request_given_hack_to_stdout(self):
+        response = handle_request({"path": "test_data/Control.vm", "stdout": True, "hack": True})
+
+        self.assertTrue(response["ok"])
+        self.assertNotIn("asm", response)
+        self.assertTrue(all(len(line) == 16 and set(line) <= {"0", "1"} for line in response["hack"].splitlines()))
+
+    def test_handle_request_given_invalid_requests(self):
+        for request in ({}, {"path": str(self.folder / "Missing.vm")}, {"source": "", "options": {"fast": True}}):
+            response = handle_request(request)
+
+            self.assertFalse(response["ok"])
+            self.assertTrue(response["error"])
+
+    def test_serve_stdio(self):
+        requests = [
+            {"id": 1, "path": str(self.folder), "bootstrap": False, "stdout": True},
+            "not json",
+            {"id": 2, "source": "push constant 1"},
+        ]
+        input_file = io.StringIO("".join(f"{request if isinstance(request, str) else json.dumps(request)}\n"
+                                         for request in requests))
+        output_file = io.StringIO()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            serve_stdio(executor, input_file, output_file)
+
+        responses = {response["id"]: response for response in map(json.loads, output_file.getvalue().splitlines())}
+        self.assertEqual(responses[1]["asm"], Path("test_data/solution_TestFolder.asm").read_text())
+        self.assertFalse(responses[None]["ok"])
+        self.assertIn("// push constant 1", responses[2]["asm"])
+
+    def test_serve_stdio_given_failed_worker(self):
+        input_file = io.StringIO(json.dumps({"id": 1, "source": "push constant 1"}) + "\n")
+        output_file = io.StringIO()
+        serve_stdio(_BrokenExecutor(), input_file, output_file)
+
+        response = json.loads(output_file.getvalue())
+        self.assertEqual(response["id"], 1)
+        self.assertFalse(response["ok"])
+        self.assertIn("BrokenProcessPool", response["error"])
+
+    def test_translation_server(self):
+        socket_path = str(Path(self._temp_dir.name) / "server.sock")
+        with ThreadPoolExecutor(max_workers=2) as executor, TranslationServer(socket_path, executor) as server:
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                responses = [send_request({"path": str(self.folder), "bootstrap": False, "stdout": True}, socket_path)
+                             for _ in range(3)]
+            finally:
+                server.shutdown()
+                thread.join()
+
+        self.assertFalse(Path(socket_path).exists())
+        for response in responses:
+            self.assertEqual(response["asm"], Path("test_data/solution_TestFolder.asm").read_text())
+
+    def test_translation_server_given_existing_paths(self):
+        socket_path = str(Path(self._temp_dir.name) / "run" / "server.sock")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with TranslationServer(socket_path, executor):
+                self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+                self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode), 0o700)
+                with self.assertRaises(Exception):
+                    TranslationServer(socket_path, executor)
+                self.assertTrue(Path(socket_path).exists())
+
+            stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale_socket.bind(socket_path)
+            stale_socket.close()
+            with TranslationServer(socket_path, executor):
+                pass
+
+            Path(socket_path).write_text("")
+            with self.assertRaises(Exception):
+                TranslationServer(socket_path, executor)
+            self.assertEqual(Path(socket_path).read_text(), "")
+
+    def test_get_default_socket_path(self):
+        with mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": "/run/user/1000"}):
+            self.assertEqual(get_default_socket_path(), "/run/user/1000/vm_translator.sock")
+        with mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": "", "XDG_CACHE_HOME": "/home/a/.cache"}):
+            self.assertEqual(get_default_socket_path(), "/home/a/.cache/vm_translator/run/vm_translator.sock")
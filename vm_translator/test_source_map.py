@@ -0,0 +1,78 @@
+import unittest
+import io
+import shutil
+import tempfile
+from pathlib import Path
+
+from vm_translator.emulator import Emulator, print_source_lines
+from vm_translator.options import Options
+from vm_translator.source_map import SourceMap, build_source_map, get_line_numbers, translate_to_asm_text, \
+    write_source_map
+
+
+class TestSourceMap(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self._temp_dir.name) / "Fibonacci"
+        shutil.copytree("test_data/Fibonacci", self.folder)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_write_source_map_given_folder(self):
+        map_path = self.folder / "Fibonacci.asm.map"
+        source_map = write_source_map(str(self.folder), map_path, need_bootstrap=True)
+        asm_lines = translate_to_asm_text(self.folder, True).splitlines()
+        addresses = self._get_command_addresses(asm_lines)
+
+        self.assertEqual(source_map.files, ["Main.vm", "Sys.vm"])
+        self.assertIsNone(source_map.lookup(0))
+        self.assertEqual(source_map.lookup(addresses["push constant 10"]), ("Sys.vm", 2, "Sys.init"))
+        self.assertEqual(source_map.lookup(addresses["push constant 10"] + 1), ("Sys.vm", 2, "Sys.init"))
+        self.assertEqual(source_map.lookup(addresses["call Main.fib 1"]), ("Main.vm", 9, "Main.fib"))
+        self.assertEqual(source_map.lookup(addresses["return"]), ("Main.vm", 15, "Main.fib"))
+
+        loaded = SourceMap.load(map_path)
+        self.assertEqual(loaded.to_dict(), source_map.to_dict())
+
+    def test_build_source_map_given_folded_constants(self):
+        vm_file = Path(self._temp_dir.name) / "Fold.vm"
+        vm_file.write_text("push local 0\n// comment\npush constant 2\npush constant 3\nadd\nadd\n")
+        options = Options(fold_constants=True)
+        asm_lines = translate_to_asm_text(vm_file, options=options).splitlines()
+        source_map = build_source_map(asm_lines, [vm_file], get_line_numbers([vm_file], False, options=options),
+                                      False)
+
+        self.assertEqual([mapping[2] for mapping in source_map.mappings if mapping[1] == 0], [1, 5, 6])
+
+    def test_build_source_map_given_mismatched_code(self):
+        vm_files = [self.folder / "Sys.vm"]
+        asm_lines = translate_to_asm_text(vm_files[0]).splitlines()
+
+        with self.assertRaises(Exception):
+            build_source_map(asm_lines, vm_files, get_line_numbers([self.folder / "Main.vm"], False), False)
+
+    def test_print_source_lines(self):
+        source_map = write_source_map(str(self.folder), self.folder / "Fibonacci.asm.map", need_bootstrap=True)
+        emulator = Emulator.from_asm(translate_to_asm_text(self.folder, True).splitlines())
+        emulator.run(1_000_000)
+        self.assertEqual(emulator.ram[16], 55)
+        self.assertEqual(sum(emulator.get_instruction_counts()), emulator.cycles)
+
+        output = io.StringIO()
+        print_source_lines(emulator, source_map, 3, output)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "Hottest VM lines:")
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line.startswith("  Main.vm:") for line in lines[1:]))
+
+    def _get_command_addresses(self, asm_lines):
+        addresses = {}
+        address = 0
+        for line in asm_lines:
+            if line.startswith("  "):
+                address += 1
+            elif line.startswith("// ") and line[3:] not in addresses:
+                addresses[line[3:]] = address
+        return addresses
@@ -0,0 +1,75 @@
+import unittest
+import io
+import json
+import shutil
+import tempfile
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from vm_translator.main import count_instructions, translate_folder
+from vm_translator.options import Options
+from vm_translator.stats import print_stats, translate_with_stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self._temp_dir.name) / "TestFolder"
+        shutil.copytree("test_data/TestFolder", self.folder)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_translate_with_stats_given_folder(self):
+        stats = translate_with_stats(str(self.folder))
+
+        self.assertEqual((self.folder / "TestFolder.asm").read_text(),
+                         Path("test_data/solution_TestFolder.asm").read_text())
+        self.assertEqual(list(stats.files), ["Main.vm", "Math.vm"])
+        self.assertEqual(set(stats.files["Main.vm"].seconds), {"read", "parse", "codegen"})
+        self.assertEqual(set(stats.program.seconds), {"link", "write"})
+
+        total = stats.get_total()
+        self.assertEqual(total.command_counts, {"C_PUSH": 4, "C_FUNCTION": 2, "C_RETURN": 2, "C_CALL": 1,
+                                                "C_ARITHMETIC": 1})
+        self.assertEqual(sum(total.kind_instructions.values()), count_instructions(str(self.folder)))
+        self.assertEqual(total.kind_instructions["push constant"], 14)
+        self.assertEqual(set(total.function_instructions), {"Main.main", "Math.add"})
+        self.assertIsNone(total.peak_memory)
+        self.assertNotIn("peak_memory_bytes", stats.to_dict()["total"])
+
+    def test_translate_with_stats_given_memory(self):
+        report = Counter()
+        stats = translate_with_stats(str(self.folder), options=Options(fold_constants=True), report=report,
+                                     measure_memory=True)
+
+        self.assertGreater(stats.files["Main.vm"].peak_memory, 0)
+        self.assertGreater(stats.get_total().peak_memory, 0)
+        self.assertEqual(stats.get_total().command_counts["C_FUNCTION"], 2)
+        self.assertEqual(set(stats.program.seconds), {"link", "write"})
+        self.assertFalse(tracemalloc.is_tracing())
+        single_report = Counter()
+        translate_with_stats(str(self.folder), options=Options(fold_constants=True), report=single_report)
+        self.assertEqual(report, single_report)
+
+    def test_translate_with_stats_given_short_labels(self):
+        translate_folder(self.folder, short_labels=True)
+        expected_output = (self.folder / "TestFolder.asm").read_text()
+        expected_label_map = (self.folder / "TestFolder.asm.labels").read_text()
+        (self.folder / "TestFolder.asm.labels").unlink()
+
+        translate_with_stats(str(self.folder), short_labels=True)
+
+        self.assertEqual((self.folder / "TestFolder.asm").read_text(), expected_output)
+        self.assertEqual((self.folder / "TestFolder.asm.labels").read_text(), expected_label_map)
+        self.assertIn("Main.main", json.loads(expected_label_map).values())
+
+    def test_print_stats(self):
+        stats = translate_with_stats(str(self.folder), need_bootstrap=True)
+        output = io.StringIO()
+        print_stats(stats, output)
+
+        self.assertIn("  Math.vm: read ", output.getvalue())
+        self.assertIn("instructions per function: Main.main 120, Math.add 100, <top level> 53", output.getvalue())
+        self.assertEqual(json.loads(json.dumps(stats.to_dict()))["total"]["instructions_per_function"]["Math.add"], 100)
@@ -0,0 +1,115 @@
+import unittest
+import io
+
+from vm_translator.tos_code_writer import TosCodeWriter
+
+
+class TestTosCodeWriter(unittest.TestCase):
+    def test_write_push_pop_keeps_top_in_d(self):
+        self._test_write([
+            ("push", "constant", 7),
+            ("push", "local", 1),
+            ("pop", "static", 3),
+        ], [
+            "// push constant 7",
+            "@7",
+            "D=A",
+            "// push local 1",
+            "@SP",
+            "A=M",
+            "M=D",
+            "@SP",
+            "M=M+1",
+            "@LCL",
+            "D=M",
+            "@1",
+            "A=D+A",
+            "D=M",
+            "// pop static 3",
+            "@Test.3",
+            "M=D",
+        ])
+
+    def test_write_arithmetic_given_uncached_top(self):
+        self._test_write([("add",), ("neg",)], [
+            "// add",
+            "@SP",
+            "AM=M-1",
+            "D=M",
+            "@SP",
+            "AM=M-1",
+            "D=D+M",
+            "// neg",
+            "D=-D",
+            "@SP",
+            "A=M",
+            "M=D",
+            "@SP",
+            "M=M+1",
+        ])
+
+    def test_write_pop_given_large_index(self):
+        self._test_write([("pop", "that", 2), ("pop", "argument", 4)], [
+            "// pop that 2",
+            "@SP",
+            "AM=M-1",
+            "D=M",
+            "@THAT",
+            "A=M",
+            "A=A+1",
+            "A=A+1",
+            "M=D",
+            "// pop argument 4",
+            "@SP",
+            "AM=M-1",
+            "D=M",
+            "@R13",
+            "M=D",
+            "@ARG",
+            "D=M",
+            "@4",
+            "D=D+A",
+            "@R14",
+            "M=D",
+            "@R13",
+            "D=M",
+            "@R14",
+            "A=M",
+            "M=D",
+        ])
+
+    def test_write_label_spills_top(self):
+        self._test_write([("push", "temp", 1), ("label", "LOOP"), ("if", "LOOP")], [
+            "// push temp 1",
+            "@6",
+            "D=M",
+            "@SP",
+            "A=M",
+            "M=D",
+            "@SP",
+            "M=M+1",
+            "// label LOOP",
+            "(Test$LOOP)",
+            "// if LOOP",
+            "@SP",
+            "AM=M-1",
+            "D=M",
+            "@Test$LOOP",
+            "D;JNE",
+        ])
+
+    def _test_write(self, commands, expected_statements):
+        output = io.StringIO()
+        with TosCodeWriter(output, "Test") as cw:
+            for command, *args in commands:
+                match command:
+                    case "push" | "pop":
+                        cw.write_push_pop(command, *args)
+                    case "label":
+                        cw.write_label(*args)
+                    case "if":
+                        cw.write_if(*args)
+                    case _:
+                        cw.write_arithmetic(command)
+
+        self.assertEqual([line.strip() for line in output.getvalue().splitlines()], expected_statements)
@@ -0,0 +1,101 @@
+import unittest
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from vm_translator.main import translate_file, translate_folder
+from vm_translator.options import Options
+from vm_translator.watch import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self._temp_dir.name) / "TestFolder"
+        shutil.copytree("test_data/TestFolder", self.folder)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_poll_given_folder(self):
+        watcher = Watcher(self.folder)
+
+        self.assertTrue(watcher.poll())
+        self.assertEqual(watcher.output_path.read_text(), Path("test_data/solution_TestFolder.asm").read_text())
+        self.assertFalse(watcher.poll())
+
+    def test_poll_given_short_labels(self):
+        for options in (Options(), Options(eliminate_dead_functions=True)):
+            watcher = Watcher(self.folder, options=options, short_labels=True)
+
+            self.assertTrue(watcher.poll())
+            output = watcher.output_path.read_text()
+            label_map = json.loads((self.folder / "TestFolder.asm.labels").read_text())
+            translate_folder(self.folder, options=options, short_labels=True)
+            self.assertEqual(output, watcher.output_path.read_text())
+            self.assertIn("Main.main", label_map.values())
+            self.assertNotIn("(Main.main)", output)
+
+    def test_poll_given_changed_file(self):
+        watcher = Watcher(self.folder, options=Options(peephole=True))
+        watcher.poll()
+
+        main_file = self.folder / "Main.vm"
+        main_file.write_text(main_file.read_text().replace("push constant 1", "push constant 30"))
+
+        self.assertTrue(watcher.poll())
+        self.assertIn("// push constant 30", watcher.output_path.read_text())
+        self.assertEqual(sorted(path.name for path in self.folder.iterdir()), ["Main.vm", "Math.vm", "TestFolder.asm"])
+
+    def test_poll_given_invalid_file(self):
+        watcher = Watcher(self.folder)
+        watcher.poll()
+        output = watcher.output_path.read_text()
+
+        (self.folder / "Main.vm").write_text("push constant x")
+        with self.assertRaises(ValueError):
+            watcher.poll()
+        self.assertFalse(watcher.poll())
+        self.assertEqual(watcher.output_path.read_text(), output)
+
+        (self.folder / "Main.vm").write_text("push constant 5")
+        self.assertTrue(watcher.poll())
+        self.assertIn("// push constant 5", watcher.output_path.read_text())
+
+    def test_poll_given_change_while_file_is_invalid(self):
+        watcher = Watcher(self.folder)
+        watcher.poll()
+        output = watcher.output_path.read_text()
+
+        (self.folder / "Main.vm").write_text("push constant x")
+        with self.assertRaises(ValueError):
+            watcher.poll()
+        math_file = self.folder / "Math.vm"
+        math_file.write_text(math_file.read_text() + "\n")
+        with self.assertRaisesRegex(Exception, "Main.vm"):
+            watcher.poll()
+        self.assertEqual(watcher.output_path.read_text(), output)
+
+        (self.folder / "Main.vm").write_text("push constant 5")
+        self.assertTrue(watcher.poll())
+        self.assertIn("// push constant 5", watcher.output_path.read_text())
+
+    def test_poll_given_file(self):
+        shutil.copy("test_data/Add.vm", self.folder)
+        watcher = Watcher(self.folder / "Add.vm")
+
+        self.assertTrue(watcher.poll())
+        self.assertEqual((self.folder / "Add.asm").read_text(), Path("test_data/solution_Add.asm").read_text())
+
+    def test_poll_given_file_and_whole_program_options(self):
+        shutil.copy("test_data/Control.vm", self.folder)
+        vm_file = self.folder / "Control.vm"
+        options = Options(eliminate_dead_functions=True, inline_threshold=12)
+        watcher = Watcher(vm_file, options=options)
+
+        self.assertTrue(watcher.poll())
+        output = watcher.output_path.read_text()
+        translate_file(str(vm_file), options=options)
+        self.assertEqual(output, watcher.output_path.read_text())
+        self.assertNotIn("// > ", output)
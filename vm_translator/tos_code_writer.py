@@ -0,0 +1,194 @@
+from typing import List, Optional
+
+from vm_translator.code_writer import SEGMENT_SYMBOLS, CodeWriter
+from vm_translator.options import Options
+from vm_translator.output_sink import Output
+
+# Indexes up to this size address local/argument/this/that with A=A+1 steps instead of R13.
+MAX_INCREMENT_INDEX = 3
+
+
+# Keeps the top of the VM stack in D across straight-line commands. While it is cached, SP points at
+# the slot the top would be stored in. It is written back before labels, branches, calls and returns.
+class TosCodeWriter(CodeWriter):
+    def __init__(self, output: Output, file_base_name: Optional[str] = None,
+                 options: Options = Options()):
+        self._cached = False
+        super().__init__(output, file_base_name, options)
+
+    def set_file_name(self, file_base_name: str):
+        self._spill()
+        super().set_file_name(file_base_name)
+
+    def end_file(self):
+        self._spill()
+        super().end_file()
+
+    def close(self):
+        self._spill()
+        super().close()
+
+    def write_text(self, text: str):
+        self._spill()
+        super().write_text(text)
+
+    def _spill(self):
+        if self._cached:
+            self._cached = False
+            self._write_statements(self._final_push)
+
+    def _get_spill_asm(self) -> List[str]:
+        statements = self._final_push if self._cached else []
+        self._cached = False
+        return statements
+
+    def _get_load_asm(self) -> List[str]:
+        if self._cached:
+            return []
+        self._cached = True
+        return [
+            "@SP",
+            "AM=M-1",
+            "D=M",
+        ]
+
+    def write_arithmetic(self, command: str):
+        match command:
+            case "add" | "sub" | "and" | "or":
+                computations = {
+                    "add": "D=D+M",
+                    "sub": "D=M-D",
+                    "and": "D=D&M",
+                    "or": "D=D|M",
+                }
+                statements = [
+                    *self._get_load_asm(),
+                    "@SP",
+                    "AM=M-1",
+                    computations[command],
+                ]
+            case "neg" | "not":
+                statements = [
+                    *self._get_load_asm(),
+                    "D=-D" if command == "neg" else "D=!D",
+                ]
+            case ("eq" | "gt" | "lt") if command in self._options.shared_comparisons:
+                self._spill()
+                super().write_arithmetic(command)
+                return
+            case "eq" | "gt" | "lt":
+                statements = [
+                    *self._get_load_asm(),
+                    "@SP",
+                    "AM=M-1",
+                    *self._get_comparison_asm(command, str(self._branch_index)),
+                ]
+                self._branch_index += 1
+            case _:
+                self._spill()
+                super().write_arithmetic(command)
+                return
+
+        self._write_statements([f"// {command}", *statements])
+
+    def write_push_pop(self, command: str, segment: str, index: int):
+        if command == "push":
+            statements = [
+                *self._get_spill_asm(),
+                *self._get_push_value_asm(segment, index),
+            ]
+            self._cached = True
+        else:
+            statements = [
+                *self._get_load_asm(),
+                *self._get_pop_value_asm(segment, index),
+            ]
+            self._cached = False
+
+        self._write_statements([f"// {command} {segment} {index}", *statements])
+
+    def _get_push_value_asm(self, segment: str, index: int) -> List[str]:
+        match segment:
+            case "constant":
+                return [f"@{index}", "D=A"]
+            case "local" | "argument" | "this" | "that":
+                return [
+                    f"@{SEGMENT_SYMBOLS[segment]}",
+                    "D=M",
+                    f"@{index}",
+                    "A=D+A",
+                    "D=M",
+                ]
+            case _:
+                return [f"@{self._get_fixed_address(segment, index)}", "D=M"]
+
+    def _get_pop_value_asm(self, segment: str, index: int) -> List[str]:
+        match segment:
+            case ("local" | "argument" | "this" | "that") if index <= MAX_INCREMENT_INDEX:
+                return [
+                    f"@{SEGMENT_SYMBOLS[segment]}",
+                    "A=M",
+                    *["A=A+1"] * index,
+                    "M=D",
+                ]
+            case "local" | "argument" | "this" | "that":
+                return [
+                    "@R13",
+                    "M=D",
+                    f"@{SEGMENT_SYMBOLS[segment]}",
+                    "D=M",
+                    f"@{index}",
+                    "D=D+A",
+                    "@R14",
+                    "M=D",
+                    "@R13",
+                    "D=M",
+                    "@R14",
+                    "A=M",
+                    "M=D",
+                ]
+            case _:
+                return [f"@{self._get_fixed_address(segment, index)}", "M=D"]
+
+    def _get_fixed_address(self, segment: str, index: int) -> str:
+        match segment:
+            case "pointer":
+                return "THIS" if index == 0 else "THAT"
+            case "temp":
+                return str(5 + index)
+            case "static":
+                return f"{self._file_base_name}.{index}"
+
+    def write_if(self, label: str):
+        statements = [
+            f"// if {label}",
+            *self._get_load_asm(),
+            f"@{self._get_label_prefix()}${label}",
+            "D;JNE"
+        ]
+        self._cached = False
+        self._write_statements(statements)
+
+    def write_label(self, label: str):
+        self._spill()
+        super().write_label(label)
+
+    def write_goto(self, label: str):
+        self._spill()
+        super().write_goto(label)
+
+    def write_function(self, function_name: str, nvars: int):
+        self._spill()
+        super().write_function(function_name, nvars)
+
+    def write_call(self, function_name: str, nvars: int):
+        self._spill()
+        super().write_call(function_name, nvars)
+
+    def write_return(self):
+        self._spill()
+        super().write_return()
+
+    def write_runtime(self):
+        self._spill()
+        super().write_runtime()
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from vm_translator.main import (
+    create_code_writer,
+    get_label_map_path,
+    get_output,
+    get_vm_files,
+    is_whole_program,
+    link,
+    translate_to_text,
+    write_header,
+    write_translations,
+)
+from vm_translator.options import Options
+
+DEFAULT_INTERVAL = 0.05
+
+FileState = Tuple[int, int]
+
+
+class Watcher:
+    def __init__(self, input_path: Path, need_bootstrap=False, options=Options(), log_file: Optional[TextIO] = None,
+                 short_labels=False):
+        self._input_path = input_path
+        self._is_folder = input_path.is_dir()
+        self._need_bootstrap = need_bootstrap and self._is_folder
+        self._options = options
+        self._log_file = log_file
+        self._file_states: Dict[Path, FileState] = {}
+        self._translations: Dict[Path, str] = {}
+        self._failures: Dict[Path, Exception] = {}
+        if self._is_folder:
+            self.output_path = input_path / f"{input_path.name}.asm"
+        else:
+            self.output_path = input_path.with_suffix(".asm")
+        self._label_map_path = get_label_map_path(self.output_path) if short_labels else None
+
+    def run(self, interval=DEFAULT_INTERVAL):
+        try:
+            while True:
+                try:
+                    self.poll()
+                except Exception as error:
+                    print(f"Failed to rebuild {self.output_path.name}: {error}", file=self._log_file or sys.stderr)
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def poll(self) -> bool:
+        start_time = time.perf_counter()
+        file_states = self._get_file_states()
+        if file_states == self._file_states:
+            return False
+
+        changed_files = [vm_file for vm_file, state in file_states.items() if self._file_states.get(vm_file) != state]
+        self._file_states = file_states
+        if self._is_folder and is_whole_program(self._options):
+            self._relink_whole_program()
+        else:
+            for vm_file in set(self._translations) - set(file_states):
+                del self._translations[vm_file]
+            for vm_file in set(self._failures) - set(file_states):
+                del self._failures[vm_file]
+            for vm_file in changed_files:
+                self._translations.pop(vm_file, None)
+                self._failures.pop(vm_file, None)
+                try:
+                    self._translations[vm_file], _ = translate_to_text(vm_file, vm_file.stem, self._options)
+                except Exception as error:
+                    self._failures[vm_file] = error
+            self._raise_failures(changed_files)
+            self._relink()
+
+        if self._log_file:
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            changed_names = ", ".join(vm_file.name for vm_file in changed_files) or "removed files"
+            print(f"Rebuilt {self.output_path.name} for {changed_names} in {elapsed_ms:.1f} ms", file=self._log_file)
+        return True
+
+    # A file that fails keeps the output from being rebuilt until it is fixed, so later changes to other files
+    # report it again instead of being skipped silently.
+    def _raise_failures(self, changed_files: List[Path]):
+        for vm_file in changed_files:
+            if vm_file in self._failures:
+                raise self._failures[vm_file]
+        if self._failures:
+            names = ", ".join(sorted(vm_file.name for vm_file in self._failures))
+            raise Exception(f"Waiting for {names} to be fixed")
+
+    def _get_file_states(self) -> Dict[Path, FileState]:
+        file_states = {}
+        for vm_file in get_vm_files(self._input_path):
+            try:
+                stat = vm_file.stat()
+            except FileNotFoundError:
+                continue
+            file_states[vm_file] = (stat.st_mtime_ns, stat.st_size)
+        return file_states
+
+    def _relink(self):
+        vm_files = list(self._file_states)
+        if not vm_files and not self._is_folder:
+            return
+
+        with _AtomicOutput(self.output_path) as out_file, \
+                create_code_writer(get_output(out_file, False, self._label_map_path), self._input_path.stem,
+                                   self._options) as code_writer:
+            if self._is_folder:
+                write_header(code_writer, self._need_bootstrap)
+                results = ((self._translations[vm_file], None) for vm_file in vm_files)
+                write_translations(code_writer, vm_files, results)
+            else:
+                code_writer.write_runtime()
+                code_writer.write_text(self._translations[vm_files[0]])
+
+    def _relink_whole_program(self):
+        with _AtomicOutput(self.output_path) as out_file:
+            link(get_output(out_file, False, self._label_map_path), self._input_path.stem, list(self._file_states),
+                 self._need_bootstrap, options=self._options)
+
+
+class _AtomicOutput:
+    def __init__(self, output_path: Path):
+        self._output_path = output_path
+
+    def __enter__(self) -> TextIO:
+        self._temp_path = self._output_path.with_name(f".{self._output_path.name}.tmp")
+        self._file = self._temp_path.open(mode="w")
+        return self._file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._temp_path, self._output_path)
+        else:
+            os.unlink(self._temp_path)
+
+
+def watch(input_path_str: str, need_bootstrap=False, options=Options(), interval=DEFAULT_INTERVAL,
+          short_labels=False):
+    Watcher(Path(input_path_str), need_bootstrap, options, sys.stdout, short_labels).run(interval)